@@ -1,7 +1,22 @@
 """Emissions Sources — Main Dash application."""
 
+import time
+
+_started = time.perf_counter()
+
 import dash
 from dash import Dash, html
+from flask import Response, g, request
+import plotly.io as pio
+
+from services import definitions, metrics, output_cache, profiling, resilience
+
+try:
+    import orjson  # noqa: F401
+
+    pio.json.config.default_engine = "orjson"
+except ImportError:
+    pass
 
 app = Dash(
     __name__,
@@ -18,6 +33,99 @@ app = Dash(
 )
 
 server = app.server
+_first_request_seen = False
+
+
+@server.before_request
+def _on_first_request():
+    """Log time-to-first-request and refresh definitions once the server is up."""
+    global _first_request_seen
+    if _first_request_seen:
+        return
+    _first_request_seen = True
+    elapsed_ms = (time.perf_counter() - _started) * 1000
+    print(f"First request served {elapsed_ms:.0f} ms after startup")
+    definitions.refresh_async()
+
+
+@server.before_request
+def _start_callback_timer():
+    if request.path.endswith("/_dash-update-component"):
+        g.callback_started = time.perf_counter()
+        g.budget = resilience.start_budget(resilience.CALLBACK_BUDGET)
+        g.profile = profiling.start(
+            request.get_json(silent=True) or {}, request.headers.get("X-Profile-Token")
+        )
+
+
+def _output_cache_key():
+    """Output cache key of this callback request, or ``None`` if not cached.
+
+    Background callbacks are left alone: their responses are job handles
+    and progress polls, and their results are already reused by the job
+    manager.
+    """
+    if not request.path.endswith("/_dash-update-component") or request.args:
+        return None
+    body = request.get_json(silent=True) or {}
+    output = body.get("output", "")
+    if not output_cache.wanted(output) or app.callback_map.get(output, {}).get("background"):
+        return None
+    return output_cache.cache_key(body)
+
+
+@server.before_request
+def _serve_cached_output():
+    key = _output_cache_key()
+    if key is None:
+        return None
+    body = output_cache.cache.get(key)
+    if body is not None:
+        return Response(body, mimetype="application/json", headers={"X-Output-Cache": "hit"})
+    g.output_key = key
+    return None
+
+
+@server.after_request
+def _store_output(response):
+    """Keep complete, fresh callback responses for ``_serve_cached_output``."""
+    key = g.pop("output_key", None)
+    if (
+        key is not None
+        and response.status_code == 200
+        and not response.direct_passthrough
+        and resilience.reusable()
+    ):
+        output_cache.cache.set(key, response.get_data())
+    return response
+
+
+@server.after_request
+def _record_callback(response):
+    """Record callback time and serialized size per output."""
+    started = g.pop("callback_started", None)
+    if started is not None:
+        output = (request.get_json(silent=True) or {}).get("output", "")
+        metrics.CALLBACK_SECONDS.observe(time.perf_counter() - started, output=output)
+        if not response.direct_passthrough:
+            metrics.RESPONSE_BYTES.observe(response.calculate_content_length() or 0, output=output)
+    return response
+
+
+@server.teardown_request
+def _finish_callback(exc):
+    budget = g.pop("budget", None)
+    if budget is not None:
+        resilience.end_budget(budget)
+    capture = g.pop("profile", None)
+    if capture is not None:
+        capture.finish()
+
+
+@server.route("/metrics")
+def _metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 
 app.layout = html.Div(
     [
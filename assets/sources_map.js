@@ -0,0 +1,144 @@
+/* Browser-side rendering of the sources map from the src-data store. */
+
+// Assumed map size in pixels when plotly does not report the visible corners.
+var MAP_WIDTH = 1000, MAP_HEIGHT = 550;
+
+function roundTo(value, step) {
+    return Math.round(value / step) * step;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    sources: {
+        // Quantized {zoom, bounds} of the map for server-side binning.
+        viewport: function (relayout, current) {
+            var noUpdate = window.dash_clientside.no_update;
+            if (!relayout) {
+                return noUpdate;
+            }
+            var prefix = "map.zoom" in relayout ? "map" : "mapbox";
+            var zoom = relayout[prefix + ".zoom"];
+            var center = relayout[prefix + ".center"];
+            if (zoom === undefined || !center) {
+                return noUpdate;
+            }
+
+            var south, north, west, east;
+            var derived = relayout[prefix + "._derived"];
+            if (derived && derived.coordinates) {
+                var lons = derived.coordinates.map(function (c) { return c[0]; });
+                var lats = derived.coordinates.map(function (c) { return c[1]; });
+                west = Math.min.apply(null, lons);
+                east = Math.max.apply(null, lons);
+                south = Math.min.apply(null, lats);
+                north = Math.max.apply(null, lats);
+            } else {
+                var degPerPixel = 360 / (512 * Math.pow(2, zoom));
+                west = center.lon - MAP_WIDTH / 2 * degPerPixel;
+                east = center.lon + MAP_WIDTH / 2 * degPerPixel;
+                south = center.lat - MAP_HEIGHT / 2 * degPerPixel;
+                north = center.lat + MAP_HEIGHT / 2 * degPerPixel;
+            }
+
+            // Snap outwards to a grid finer than one bin so small pans reuse
+            // the previous viewport.
+            var step = 360 / (512 * Math.pow(2, Math.floor(Math.max(zoom, 0)))) * 10;
+            var view = {
+                zoom: roundTo(zoom, 0.25),
+                bounds: [
+                    Math.floor(south / step) * step,
+                    Math.ceil(north / step) * step,
+                    Math.floor(west / step) * step,
+                    Math.ceil(east / step) * step
+                ]
+            };
+            if (current && JSON.stringify(current) === JSON.stringify(view)) {
+                return noUpdate;
+            }
+            return view;
+        },
+
+        // Filters for a server-side view, or null while the browser can
+        // render from src-data; unchanged requests are not sent again.
+        viewRequest: function (year, gas, sectors, limit, viewport, data, current) {
+            var noUpdate = window.dash_clientside.no_update;
+            var request = null;
+            if (viewport || (data && limit > data.maxLimit)) {
+                request = {
+                    year: year,
+                    gas: gas,
+                    sectors: sectors,
+                    limit: limit,
+                    viewport: viewport,
+                };
+            }
+            if (!request && !current) {
+                return noUpdate;
+            }
+            if (JSON.stringify(request) === JSON.stringify(current)) {
+                return noUpdate;
+            }
+            return request;
+        },
+
+        render: function (data, view, sectors, limit) {
+            if (!data) {
+                return window.dash_clientside.no_update;
+            }
+            // A server-side view (viewport query or binned map) wins.
+            if (view) {
+                return view.figure;
+            }
+            if (limit > data.maxLimit) {
+                return window.dash_clientside.no_update;
+            }
+
+            var wanted = null;
+            if (sectors && sectors.length) {
+                wanted = {};
+                sectors.forEach(function (s) {
+                    var idx = data.sectorKeys.indexOf(s);
+                    if (idx >= 0) {
+                        wanted[idx] = true;
+                    }
+                });
+            }
+
+            // Rows arrive sorted by emissions, so the first `limit` matches
+            // are the top sources for this selection.
+            var lat = [], lon = [], emissions = [], customdata = [];
+            for (var i = 0; i < data.emissions.length && emissions.length < limit; i++) {
+                var sector = data.sector[i];
+                if (wanted && !wanted[sector]) {
+                    continue;
+                }
+                lat.push(data.lat[i]);
+                lon.push(data.lon[i]);
+                emissions.push(data.emissions[i]);
+                customdata.push([data.name[i], data.sectorLabels[sector], data.country[i]]);
+            }
+
+            var traces = [];
+            if (emissions.length) {
+                var peak = emissions[0];
+                var minSize = data.sizeRange[0], maxSize = data.sizeRange[1];
+                var marker = Object.assign({}, data.marker, {
+                    size: emissions.map(function (q) {
+                        var size = peak > 0 ? q / peak * maxSize : minSize;
+                        return Math.max(minSize, Math.min(maxSize, size));
+                    }),
+                    color: emissions
+                });
+                traces.push({
+                    type: "scattermap",
+                    lat: lat,
+                    lon: lon,
+                    marker: marker,
+                    customdata: customdata,
+                    hovertemplate: data.hovertemplate
+                });
+            }
+
+            return {data: traces, layout: data.layout};
+        }
+    }
+});
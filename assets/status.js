@@ -0,0 +1,34 @@
+/* Page status indicators shared by the data pages. */
+
+var STALE_TEXT =
+    "Climate Trace is not responding. Showing the last data received, " +
+    "which may be out of date.";
+var MISSING_TEXT =
+    "Climate Trace is not responding, so some data could not be loaded. " +
+    "Charts may be empty or incomplete; try again in a few minutes.";
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    status: {
+        // Show the banner when any of the given stores was built while
+        // upstream calls were failing. Stores filled entirely from the last
+        // good payloads say so; any store left without data says that.
+        banner: function () {
+            var stale = false, missing = false;
+            for (var i = 0; i < arguments.length; i++) {
+                var store = arguments[i];
+                if (!store) {
+                    continue;
+                }
+                stale = stale || store.stale;
+                missing = missing || (store.degraded && !store.stale);
+            }
+            if (missing) {
+                return [{}, MISSING_TEXT];
+            }
+            if (stale) {
+                return [{}, STALE_TEXT];
+            }
+            return [{display: "none"}, ""];
+        },
+    },
+});
@@ -0,0 +1,95 @@
+"""Micro-benchmark: per-sector loops vs. MonthlyMatrix for emissions timeseries.
+
+Usage:
+    python -m benchmarks.aggregation [--keys 10 100 1000] [--repeat 20]
+
+``loops`` is the aggregation that update_charts used to do: one pass to
+sum the selected sectors per month, then a filter and sort per selected
+sector. ``matrix`` builds a MonthlyMatrix and slices it;
+``prebuilt_matrix`` only slices, which is what the figure callbacks do
+once the matrix sits in the page's store.
+Each figure is the best of ``--repeat`` runs, in microseconds.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from services.aggregation import MonthlyMatrix
+
+
+def synthetic_timeseries(n_keys, seed=0):
+    rng = random.Random(seed)
+    keys = [f"sector-{i}" for i in range(n_keys)]
+    entries = [
+        {"sector": k, "month": m, "emissionsQuantity": rng.uniform(1e3, 1e8)}
+        for k in keys
+        for m in range(1, 13)
+    ]
+    rng.shuffle(entries)
+    return keys, entries
+
+
+def loops(entries, selected):
+    monthly_totals = {}
+    for entry in entries:
+        if entry["sector"] in selected:
+            month = entry["month"]
+            monthly_totals[month] = monthly_totals.get(month, 0) + entry["emissionsQuantity"]
+    totals = [monthly_totals[m] for m in sorted(monthly_totals)]
+    series = []
+    for sector_key in selected:
+        rows = sorted(
+            [e for e in entries if e["sector"] == sector_key], key=lambda e: e["month"]
+        )
+        series.append([e["emissionsQuantity"] for e in rows])
+    return totals, series
+
+
+def matrix(entries, selected):
+    return query(MonthlyMatrix.from_entries(entries), selected)
+
+
+def query(built, selected):
+    m = built.select(selected)
+    return m.totals(), [m.row(k) for k in selected]
+
+
+def timed(fn, repeat, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for n_keys in args.keys:
+        keys, entries = synthetic_timeseries(n_keys)
+        for n_selected in sorted({1, min(3, n_keys), n_keys}):
+            selected = keys[:n_selected]
+            print(
+                json.dumps(
+                    {
+                        "keys": n_keys,
+                        "selected": n_selected,
+                        "loops_us": round(timed(loops, args.repeat, entries, selected), 1),
+                        "matrix_us": round(timed(matrix, args.repeat, entries, selected), 1),
+                        "prebuilt_matrix_us": round(
+                            timed(query, args.repeat, MonthlyMatrix.from_entries(entries), selected),
+                            1,
+                        ),
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
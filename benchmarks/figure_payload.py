@@ -0,0 +1,65 @@
+"""Measure sources-map figure payload size and serialization time.
+
+Usage:
+    python -m benchmarks.figure_payload [--limits 50 500 5000] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from plotly.io.json import to_json_plotly
+
+from figures.sources_map import build_sources_map
+from services.api import SECTORS
+
+
+def synthetic_sources(n, seed=0):
+    """Source dicts shaped like ``get_sources`` output."""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "name": f"Source {i} {rng.choice(['Plant', 'Mine', 'Field', 'Port'])}",
+            "sector": rng.choice(SECTORS),
+            "country": rng.choice(["KEN", "USA", "CHN", "IND", "BRA", "DEU"]),
+            "emissionsQuantity": rng.lognormvariate(13, 2),
+            "centroid": {
+                "latitude": rng.uniform(-60, 70),
+                "longitude": rng.uniform(-180, 180),
+            },
+        }
+        for i in range(n)
+    ]
+
+
+def measure(limit, repeat, engine):
+    sources = synthetic_sources(limit)
+    fig = build_sources_map(sources)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = to_json_plotly(fig, engine=engine)
+        timings.append(time.perf_counter() - start)
+    return {
+        "limit": limit,
+        "engine": engine,
+        "bytes": len(payload.encode()),
+        "serialize_ms": round(min(timings) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limits", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for limit in args.limits:
+        for engine in ("json", "orjson"):
+            print(json.dumps(measure(limit, args.repeat, engine)))
+
+
+if __name__ == "__main__":
+    main()
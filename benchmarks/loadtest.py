@@ -0,0 +1,332 @@
+"""Concurrent load test of the Dash callback endpoint under gunicorn.
+
+Usage:
+    python -m benchmarks.loadtest [--configs 1x8 2x4 4x4] [--viewers 200]
+                                  [--duration 30] [--think 1.0]
+                                  [--latency 50] [--jitter 10]
+                                  [--payloads recorded.jsonl] [--out results.json]
+
+For every ``WORKERSxTHREADS`` config this starts ``gunicorn app:server``
+against an in-process API stub (``benchmarks.stub_server``) and runs
+``--viewers`` simulated viewers for ``--duration`` seconds. Each viewer
+opens one of the pages with its default filters, the way the browser
+fires the initial callbacks, then keeps changing random filters with a
+think time between steps. ``--payloads`` replays recorded
+``/_dash-update-component`` request bodies (one JSON object per line, as
+copied from the browser's network tab) instead of the built-in mix.
+
+Callbacks that run as background jobs (``CLIMATE_TRACE_BACKGROUND_CALLBACKS``)
+are polled like the browser does, every ``CLIMATE_TRACE_JOB_POLL_INTERVAL``
+ms, and timed until their result arrives rather than until submission.
+
+Reports throughput and p50/p95/p99 latency per callback output as JSON.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from benchmarks.suite import EUROPE, _callback_body, _configure, _free_port
+
+YEARS = [2021, 2022, 2023, 2024]
+GASES = ["co2e_100yr", "co2", "ch4"]
+CONTINENTS = ["all", "Africa", "Asia", "Europe", "North America"]
+SECTORS = ["power", "waste", "agriculture", "transportation", "manufacturing"]
+VIEWPORTS = [None, EUROPE, {"zoom": 4, "bounds": [20, 45, 95, 125]}]
+# Sources the sources page keeps in the browser (pages.sources_ranked._max_limit).
+MAX_LIMIT = 500
+# Seconds between polls for a background job's result, as in the browser.
+POLL_INTERVAL = int(os.environ.get("CLIMATE_TRACE_JOB_POLL_INTERVAL", "250")) / 1000
+# Seconds a callback, including all polls for its job, may take.
+CALLBACK_TIMEOUT = 120
+
+
+class Recorder:
+    """Thread-safe latency samples per callback output."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.jobs = {}
+
+    def add(self, output, seconds, ok, job=False):
+        with self._lock:
+            if job:
+                self.jobs[output] = self.jobs.get(output, 0) + 1
+            if ok:
+                self.samples.setdefault(output, []).append(seconds)
+            else:
+                self.errors[output] = self.errors.get(output, 0) + 1
+
+    def report(self, elapsed):
+        def pct(values, q):
+            return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 2)
+
+        rows = {}
+        for output in sorted(set(self.samples) | set(self.errors)):
+            values = sorted(self.samples.get(output, []))
+            rows[output] = {
+                "requests": len(values),
+                "errors": self.errors.get(output, 0),
+                "jobs": self.jobs.get(output, 0),
+                "rps": round(len(values) / elapsed, 2),
+            }
+            if values:
+                rows[output].update(
+                    p50_ms=pct(values, 0.50),
+                    p95_ms=pct(values, 0.95),
+                    p99_ms=pct(values, 0.99),
+                    mean_ms=round(statistics.fmean(values) * 1000, 2),
+                )
+        return rows
+
+
+class Viewer:
+    """One simulated browser tab issuing callback requests in sequence."""
+
+    def __init__(self, url, recorder, think, rng, payloads=None):
+        self.url = f"{url}/_dash-update-component"
+        self.recorder = recorder
+        self.think = think
+        self.rng = rng
+        self.payloads = payloads
+        self.session = requests.Session()
+
+    def post(self, body):
+        start = time.perf_counter()
+        job = False
+        try:
+            response = self.session.post(self.url, json=body, timeout=CALLBACK_TIMEOUT)
+            ok = response.status_code in (200, 204)
+            data = response.json() if response.status_code == 200 else None
+            if data and "cacheKey" in data and "job" in data:
+                job = True
+                ok, data = self.wait(body, data["cacheKey"], data["job"], start)
+        except (requests.RequestException, ValueError):
+            ok, data = False, None
+        self.recorder.add(body["output"], time.perf_counter() - start, ok, job)
+        return data
+
+    def wait(self, body, cache_key, job, start):
+        """Poll a background job until its result arrives; ``(ok, data)``."""
+        params = {"cacheKey": cache_key, "job": job}
+        while time.perf_counter() - start < CALLBACK_TIMEOUT:
+            time.sleep(POLL_INTERVAL)
+            response = self.session.post(
+                self.url, params=params, json=body, timeout=CALLBACK_TIMEOUT
+            )
+            # 204: the job finished without an update or was cancelled.
+            if response.status_code == 204:
+                return True, None
+            if response.status_code != 200:
+                return False, None
+            data = response.json()
+            # Until the job finishes, polls carry only its progress.
+            if "response" in data:
+                return True, data
+        return False, None
+
+    def pause(self):
+        time.sleep(self.rng.expovariate(1 / self.think) if self.think else 0)
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            if self.payloads:
+                self.post(self.rng.choice(self.payloads))
+                self.pause()
+            elif self.rng.random() < 0.5:
+                self.sources_session(deadline)
+            else:
+                self.aggregate_session(deadline)
+
+    def sources_session(self, deadline):
+        state = {"year": 2024, "gas": "co2e_100yr", "sectors": [], "limit": 500, "viewport": None}
+
+        def load():
+            inputs = [("src-year", "value", state["year"]), ("src-gas", "value", state["gas"])]
+            self.post(_callback_body([("src-data", "data")], inputs, ["src-year.value"]))
+
+        sent = {"request": None}
+
+        def view():
+            # Mirrors sources.viewRequest: the browser renders the first
+            # MAX_LIMIT sources itself until the map is moved.
+            request = None
+            if state["viewport"] or state["limit"] > MAX_LIMIT:
+                request = dict(state)
+            if request == sent["request"]:
+                return
+            sent["request"] = request
+            inputs = [("src-view-request", "data", request)]
+            self.post(_callback_body([("src-view", "data")], inputs, ["src-view-request.data"]))
+
+        load()
+        view()
+        for _ in range(self.rng.randint(2, 6)):
+            if time.monotonic() >= deadline:
+                return
+            self.pause()
+            change = self.rng.choice(["year", "gas", "sectors", "limit", "viewport"])
+            if change == "year":
+                state["year"] = self.rng.choice(YEARS)
+            elif change == "gas":
+                state["gas"] = self.rng.choice(GASES)
+            elif change == "sectors":
+                state["sectors"] = self.rng.sample(SECTORS, self.rng.randint(0, 3))
+            elif change == "limit":
+                state["limit"] = self.rng.choice([50, 100, 200, 500, 5000, 20000])
+            else:
+                state["viewport"] = self.rng.choice(VIEWPORTS)
+            if change in ("year", "gas"):
+                load()
+            view()
+
+    def aggregate_session(self, deadline):
+        state = {"year": 2024, "continent": "all", "gas": "co2e_100yr", "sectors": []}
+        store = None
+
+        def load():
+            inputs = [
+                ("agg-year", "value", state["year"]),
+                ("agg-continent", "value", state["continent"]),
+                ("agg-gas", "value", state["gas"]),
+            ]
+            data = self.post(_callback_body([("agg-data", "data")], inputs, ["agg-year.value"]))
+            return (data or {}).get("response", {}).get("agg-data", {}).get("data")
+
+        def charts(trigger):
+            for chart in ("total", "sector"):
+                outputs = [(f"agg-{chart}-chart", "figure"), (f"agg-{chart}-title", "children")]
+                inputs = [("agg-data", "data", store), ("agg-sectors", "value", state["sectors"])]
+                self.post(_callback_body(outputs, inputs, [trigger]))
+
+        store = load()
+        charts("agg-data.data")
+        for _ in range(self.rng.randint(2, 6)):
+            if time.monotonic() >= deadline:
+                return
+            self.pause()
+            change = self.rng.choice(["year", "continent", "gas", "sectors"])
+            if change == "sectors":
+                state["sectors"] = self.rng.sample(SECTORS, self.rng.randint(0, 3))
+                charts("agg-sectors.value")
+                continue
+            state[change] = self.rng.choice(
+                {"year": list(range(2015, 2025)), "continent": CONTINENTS, "gas": GASES}[change]
+            )
+            store = load()
+            charts("agg-data.data")
+
+
+def _wait_ready(url, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+        try:
+            if requests.get(f"{url}/", timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def run_config(config, args, payloads):
+    workers, threads = (int(n) for n in config.lower().split("x"))
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "app:server",
+            "--workers", str(workers),
+            "--threads", str(threads),
+            "--bind", f"127.0.0.1:{port}",
+            "--timeout", "120",
+            "--log-level", "warning",
+        ],
+        env=dict(os.environ),
+    )
+    try:
+        _wait_ready(url, proc)
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+        viewers = [
+            threading.Thread(
+                target=Viewer(url, recorder, args.think, random.Random(i), payloads).run,
+                args=(deadline,),
+                daemon=True,
+            )
+            for i in range(args.viewers)
+        ]
+        started = time.monotonic()
+        for t in viewers:
+            t.start()
+        for t in viewers:
+            t.join()
+        elapsed = time.monotonic() - started
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    callbacks = recorder.report(elapsed)
+    total = sum(row["requests"] for row in callbacks.values())
+    return {
+        "config": config,
+        "workers": workers,
+        "threads": threads,
+        "viewers": args.viewers,
+        "seconds": round(elapsed, 1),
+        "rps": round(total / elapsed, 2),
+        "errors": sum(row["errors"] for row in callbacks.values()),
+        "callbacks": callbacks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Dash callback endpoint.")
+    parser.add_argument("--configs", nargs="+", default=["1x8", "2x4", "4x4"])
+    parser.add_argument("--viewers", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30, help="seconds per config")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time in seconds")
+    parser.add_argument("--latency", type=float, default=50, help="stub latency in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="stub jitter in ms")
+    parser.add_argument("--payloads", help="JSONL of recorded callback request bodies")
+    parser.add_argument("--out", help="write results here instead of stdout")
+    args = parser.parse_args()
+
+    payloads = None
+    if args.payloads:
+        with open(args.payloads) as f:
+            payloads = [json.loads(line) for line in f if line.strip()]
+
+    stub_port = _free_port()
+    # gunicorn workers inherit this environment and talk to the stub.
+    _configure(stub_port)
+    from benchmarks.stub_server import StubServer
+
+    stub = StubServer(stub_port, latency=args.latency / 1000, jitter=args.jitter / 1000).start()
+    try:
+        results = [run_config(config, args, payloads) for config in args.configs]
+    finally:
+        stub.shutdown()
+
+    text = json.dumps({"latency_ms": args.latency, "jitter_ms": args.jitter, "runs": results}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Local stand-in for the Climate Trace API used by the benchmark suite.
+
+Usage:
+    python -m benchmarks.stub_server [--port 8765] [--fixtures DIR]
+                                     [--latency 50] [--jitter 20]
+                                     [--record https://api.climatetrace.org/v7]
+
+Requests are answered from recorded JSON fixtures named after the path and
+query string. Without a fixture the server synthesizes a deterministic
+response of the right shape. With ``--record UPSTREAM`` missing fixtures
+are fetched from the real API and saved, so one run of the suite against
+a recording stub captures everything it needs; ``python -m benchmarks.suite
+--record`` does exactly that.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from benchmarks.figure_payload import synthetic_sources
+from services.api import SECTORS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+GASES = ["co2e_100yr", "co2e_20yr", "co2", "ch4", "n2o"]
+CONTINENTS = ["Africa", "Asia", "Europe", "North America", "South America", "Oceania"]
+# Synthetic rankings are cut from one pool per (year, gas).
+SYNTHETIC_POOL = 25000
+
+
+def fixture_name(path, params):
+    """File name of the fixture for ``path`` with query ``params``."""
+    query = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+    digest = hashlib.sha1(query.encode()).hexdigest()[:12]
+    return f"{path.strip('/').replace('/', '_') or 'root'}__{digest}.json"
+
+
+def _seed(*parts):
+    return int(hashlib.sha1(repr(parts).encode()).hexdigest()[:8], 16)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _source_pool(year, gas):
+    key = (year, gas)
+    with _pools_lock:
+        if key not in _pools:
+            pool = synthetic_sources(SYNTHETIC_POOL, seed=_seed(year, gas))
+            pool.sort(key=lambda s: s["emissionsQuantity"], reverse=True)
+            _pools[key] = pool
+        return _pools[key]
+
+
+def synthetic_response(path, params):
+    """A deterministic response shaped like the real endpoint, or ``None``."""
+    if path.endswith("/definitions/gases"):
+        return GASES
+    if path.endswith("/definitions/continents"):
+        return CONTINENTS + ["Antarctica"]
+    if path.endswith("/sources/emissions"):
+        return _synthetic_emissions(params)
+    if path.endswith("/sources"):
+        pool = _source_pool(params.get("year"), params.get("gas"))
+        sectors = params.get("sectors")
+        if sectors:
+            wanted = set(sectors.split(","))
+            pool = [s for s in pool if s["sector"] in wanted]
+        offset = int(params.get("offset", 0))
+        return pool[offset : offset + int(params.get("limit", 100))]
+    return None
+
+
+def _synthetic_emissions(params):
+    rng = random.Random(_seed(params.get("year"), params.get("gas"), params.get("continent")))
+    selected = params["sector"].split(",") if params.get("sector") else SECTORS
+    timeseries, subseries = [], []
+    for sector in selected:
+        base = rng.lognormvariate(18, 1.5)
+        for month in range(1, 13):
+            q = base * rng.uniform(0.8, 1.2)
+            timeseries.append({"sector": sector, "month": month, "emissionsQuantity": q})
+            for i in range(3):
+                subseries.append(
+                    {
+                        "sector": sector,
+                        "subsector": f"{sector}-{i}",
+                        "month": month,
+                        "emissionsQuantity": q / 3,
+                    }
+                )
+    monthly = {}
+    for e in timeseries:
+        monthly[e["month"]] = monthly.get(e["month"], 0) + e["emissionsQuantity"]
+    sums = {}
+    for e in timeseries:
+        sums[e["sector"]] = sums.get(e["sector"], 0) + e["emissionsQuantity"]
+    grand = sum(sums.values())
+    return {
+        "totals": {
+            "timeseries": [{"month": m, "emissionsQuantity": q} for m, q in sorted(monthly.items())],
+            "summaries": [{"emissionsQuantity": grand}],
+        },
+        "sectors": {
+            "timeseries": timeseries,
+            "summaries": [
+                {"sector": s, "emissionsQuantity": q, "percentage": q / grand * 100}
+                for s, q in sums.items()
+            ],
+        },
+        "subsectors": {"timeseries": subseries, "summaries": []},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "ClimateTraceStub/1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        stub = self.server
+        delay = stub.latency + random.uniform(-stub.jitter, stub.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        body = stub.lookup(url.path, params)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub API server.
+
+    Args:
+        port: Port to bind on localhost; 0 picks a free one.
+        fixtures: Directory of recorded responses.
+        latency: Added delay per request in seconds.
+        jitter: Max random seconds added to or removed from ``latency``.
+        upstream: Real API root to record missing fixtures from, or ``None``.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, fixtures=FIXTURES_DIR, latency=0.0, jitter=0.0, upstream=None):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.upstream = upstream.rstrip("/") if upstream else None
+        # Requests answered with synthesized data because no fixture existed.
+        self.synthetic = 0
+        # Paths arrive with the API prefix, e.g. /v7/sources.
+        self.prefix = "/v7"
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}{self.prefix}"
+
+    def lookup(self, path, params):
+        """Encoded response body for a request, or ``None`` for a 404."""
+        relative = path[len(self.prefix) :] if path.startswith(self.prefix) else path
+        fixture = os.path.join(self.fixtures, fixture_name(relative, params))
+        if os.path.exists(fixture):
+            with open(fixture, "rb") as f:
+                return f.read()
+        if self.upstream:
+            response = requests.get(f"{self.upstream}{relative}", params=params, timeout=60)
+            if response.ok:
+                os.makedirs(self.fixtures, exist_ok=True)
+                with open(fixture, "wb") as f:
+                    f.write(response.content)
+                return response.content
+        data = synthetic_response(relative, params)
+        if data is None:
+            return None
+        self.synthetic += 1
+        return json.dumps(data).encode()
+
+    def start(self):
+        """Serve on a daemon thread and return ``self``."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local Climate Trace API stub.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--latency", type=float, default=0, help="added latency in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="latency jitter in ms")
+    parser.add_argument("--record", metavar="UPSTREAM", help="record missing fixtures")
+    args = parser.parse_args()
+
+    server = StubServer(
+        args.port, args.fixtures, args.latency / 1000, args.jitter / 1000, args.record
+    )
+    print(f"Serving {server.url} (set CLIMATE_TRACE_BASE_URL to use it)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""End-to-end benchmarks against the local Climate Trace API stub.
+
+Usage:
+    python -m benchmarks.suite [--latency 50] [--jitter 10] [--repeat 5]
+                               [--out results.json]
+                               [--baseline previous.json] [--tolerance 0.25]
+                               [--fixtures DIR]
+                               [--record https://api.climatetrace.org/v7]
+
+Starts ``benchmarks.stub_server`` on a free port, points the app at it and
+times the ``services.api`` functions and the page callbacks (through the
+Flask test client, so Dash dispatch and serialization are included) cold,
+with empty caches, and warm. Results are written as JSON. With
+``--baseline`` the run exits non-zero when any case's median is slower
+than the baseline by more than ``--tolerance``.
+
+The stub answers from the recorded fixtures in ``benchmarks/fixtures`` and
+synthesizes anything missing; ``meta.synthetic_responses`` in the report
+counts those, and numbers from runs with synthetic responses do not reflect
+real payload sizes. Run once with ``--record`` (from a machine or CI job
+with access to the API) to fetch every missing response and save it as a
+fixture, then commit the directory.
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Differences below this many ms are treated as noise when comparing runs.
+NOISE_MS = 1.0
+
+EUROPE = {"zoom": 3, "bounds": [34, 62, -12, 32]}
+SECTOR_COMBOS = [[], ["power"], ["power", "waste", "agriculture"]]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _configure(port):
+    """Point every data source at the stub; must run before importing the app."""
+    workdir = tempfile.mkdtemp(prefix="climatetrace-bench-")
+    os.environ.update(
+        {
+            "CLIMATE_TRACE_BASE_URL": f"http://127.0.0.1:{port}/v7",
+            "CLIMATE_TRACE_BACKEND": "api",
+            "CLIMATE_TRACE_CACHE_PATH": "",
+            "CLIMATE_TRACE_CUBE_PATH": os.path.join(workdir, "missing-cube.npz"),
+            "CLIMATE_TRACE_DEFINITIONS_PATH": os.path.join(workdir, "definitions.json"),
+            "CLIMATE_TRACE_PROFILE": "",
+        }
+    )
+    # Measure the app, not the upstream rate limiter, unless asked to.
+    os.environ.setdefault("CLIMATE_TRACE_RATE_LIMIT", "0")
+
+
+def _summary(name, params, timings, size=None):
+    timings = sorted(timings)
+    result = {
+        "name": name,
+        "params": params,
+        "runs": len(timings),
+        "min_ms": round(timings[0] * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+    }
+    if size is not None:
+        result["bytes"] = size
+    return result
+
+
+def _callback_body(outputs, inputs, changed):
+    """``/_dash-update-component`` request body.
+
+    Args:
+        outputs: ``(id, property)`` pairs.
+        inputs: ``(id, property, value)`` triples.
+        changed: ``id.property`` strings of the triggering inputs.
+    """
+    output = "...".join(f"{i}.{p}" for i, p in outputs)
+    return {
+        "output": f"..{output}.." if len(outputs) > 1 else output,
+        "outputs": [{"id": i, "property": p} for i, p in outputs]
+        if len(outputs) > 1
+        else {"id": outputs[0][0], "property": outputs[0][1]},
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "changedPropIds": changed,
+        "state": [],
+    }
+
+
+class Runner:
+    def __init__(self, repeat):
+        from services import api, geo, output_cache
+
+        import app
+        from pages import sources_ranked
+
+        self.api = api
+        self.max_limit = sources_ranked._max_limit
+        self.geo = geo
+        self.output_cache = output_cache
+        self.client = app.server.test_client()
+        self.repeat = repeat
+        self.results = []
+
+    def reset(self):
+        """Drop every in-process cache so the next call goes upstream."""
+        self.api.cache.clear()
+        self.output_cache.cache.clear()
+        with self.geo._lock:
+            self.geo._source_sets.clear()
+
+    def time(self, name, params, fn, cold):
+        timings = []
+        size = None
+        for _ in range(self.repeat):
+            if cold:
+                self.reset()
+            start = time.perf_counter()
+            out = fn()
+            timings.append(time.perf_counter() - start)
+            if isinstance(out, bytes):
+                size = len(out)
+        self.results.append(_summary(name, dict(params, cold=cold), timings, size))
+
+    def post(self, body):
+        def call():
+            response = self.client.post("/_dash-update-component", json=body)
+            if response.status_code not in (200, 204):
+                raise RuntimeError(f"{body['output']}: HTTP {response.status_code}")
+            return response.get_data()
+
+        return call
+
+    def services(self):
+        api = self.api
+        for cold in (True, False):
+            self.time("get_gases", {}, api.get_gases, cold)
+            self.time("get_continents", {}, api.get_continents, cold)
+            for limit in (100, 500):
+                for sectors in (None, ["power", "waste"]):
+                    self.time(
+                        "get_sources",
+                        {"limit": limit, "sectors": sectors},
+                        lambda: api.get_sources(year=2024, sectors=sectors, limit=limit),
+                        cold,
+                    )
+            self.time(
+                "get_sources_by_sector",
+                {"limit": 500},
+                lambda: api.get_sources_by_sector(year=2024, limit=500),
+                cold,
+            )
+            for continent in (None, "Europe"):
+                self.time(
+                    "get_emissions",
+                    {"continent": continent},
+                    lambda: api.get_emissions(year=2024, continent=continent),
+                    cold,
+                )
+        self.time(
+            "iter_sources",
+            {"limit": 5000},
+            lambda: sum(len(b) for b in api.iter_sources(2024, limit=5000)),
+            True,
+        )
+
+    def sources_page(self):
+        year_gas = [("src-year", "value", 2024), ("src-gas", "value", "co2e_100yr")]
+        for cold in (True, False):
+            body = _callback_body([("src-data", "data")], year_gas, ["src-year.value"])
+            self.time("load_sources", {}, self.post(body), cold)
+            for limit in (50, 500, 5000, 20000):
+                for viewport in (None, EUROPE):
+                    # The browser renders these itself; see sources.viewRequest.
+                    if viewport is None and limit <= self.max_limit:
+                        continue
+                    request = {
+                        "year": 2024,
+                        "gas": "co2e_100yr",
+                        "sectors": [],
+                        "limit": limit,
+                        "viewport": viewport,
+                    }
+                    inputs = [("src-view-request", "data", request)]
+                    body = _callback_body(
+                        [("src-view", "data")], inputs, ["src-view-request.data"]
+                    )
+                    params = {"limit": limit, "viewport": bool(viewport)}
+                    self.time("update_map_view", params, self.post(body), cold)
+
+    def aggregate_page(self):
+        for continent in ("all", "Europe"):
+            inputs = [
+                ("agg-year", "value", 2024),
+                ("agg-continent", "value", continent),
+                ("agg-gas", "value", "co2e_100yr"),
+            ]
+            body = _callback_body([("agg-data", "data")], inputs, ["agg-year.value"])
+            for cold in (True, False):
+                self.time("load_emissions", {"continent": continent}, self.post(body), cold)
+            response = self.client.post("/_dash-update-component", json=body)
+            store = response.get_json()["response"]["agg-data"]["data"]
+
+            for chart in ("total", "sector"):
+                outputs = [(f"agg-{chart}-chart", "figure"), (f"agg-{chart}-title", "children")]
+                for sectors in SECTOR_COMBOS:
+                    inputs = [("agg-data", "data", store), ("agg-sectors", "value", sectors)]
+                    for trigger in ("agg-data.data", "agg-sectors.value"):
+                        body = _callback_body(outputs, inputs, [trigger])
+                        params = {
+                            "continent": continent,
+                            "sectors": sectors,
+                            "patch": trigger == "agg-sectors.value",
+                        }
+                        self.time(f"update_{chart}_chart", params, self.post(body), False)
+
+
+def _meta(args, stub):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "latency_ms": args.latency,
+        "jitter_ms": args.jitter,
+        "repeat": args.repeat,
+        "fixtures": stub.fixtures,
+        "synthetic_responses": stub.synthetic,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Cases whose median regressed against ``baseline`` beyond ``tolerance``."""
+
+    def key(r):
+        return r["name"], json.dumps(r["params"], sort_keys=True)
+
+    previous = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get(key(r))
+        if old is None:
+            continue
+        limit = old["median_ms"] * (1 + tolerance)
+        if r["median_ms"] > limit and r["median_ms"] - old["median_ms"] > NOISE_MS:
+            regressions.append(
+                f"{r['name']} {r['params']}: {old['median_ms']} ms -> {r['median_ms']} ms"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app against the API stub.")
+    parser.add_argument("--latency", type=float, default=50, help="stub latency in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="stub jitter in ms")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fixtures", help="recorded responses (default: benchmarks/fixtures)")
+    parser.add_argument("--record", metavar="UPSTREAM", help="record missing fixtures")
+    parser.add_argument("--out", help="write results here instead of stdout")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    port = _free_port()
+    _configure(port)
+    from benchmarks.stub_server import FIXTURES_DIR, StubServer
+
+    stub = StubServer(
+        port,
+        args.fixtures or FIXTURES_DIR,
+        args.latency / 1000,
+        args.jitter / 1000,
+        args.record,
+    ).start()
+    try:
+        runner = Runner(args.repeat)
+        runner.services()
+        runner.sources_page()
+        runner.aggregate_page()
+    finally:
+        stub.shutdown()
+
+    report = {"meta": _meta(args, stub), "results": runner.results}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if stub.synthetic:
+        print(
+            f"{stub.synthetic} stub responses were synthetic; record fixtures with --record",
+            file=sys.stderr,
+        )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(runner.results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Scattermap figure builder for ranked emission sources."""
+
+import numpy as np
+
+from services.metrics import BUILD_SECONDS
+
+MIN_MARKER_SIZE = 8
+MAX_MARKER_SIZE = 35
+
+# ~11 m at the equator; finer coordinates only inflate the payload.
+COORD_DECIMALS = 4
+
+HOVER_TEMPLATE = (
+    "%{customdata[0]}<br>"
+    "Sector: %{customdata[1]}<br>"
+    "Country: %{customdata[2]}<br>"
+    "Emissions: %{marker.color:,.3~s} tonnes"
+    "<extra></extra>"
+)
+
+
+def source_columns(sources):
+    """Flatten source dicts into NumPy columns in a single pass.
+
+    Args:
+        sources: List of source summary dicts as returned by ``get_sources``.
+
+    Returns:
+        Dict of equal-length arrays: ``lat``, ``lon``, ``emissions``,
+        ``name``, ``sector`` and ``country``.
+    """
+    n = len(sources)
+    lat = np.empty(n)
+    lon = np.empty(n)
+    emissions = np.empty(n)
+    name = [None] * n
+    sector = [None] * n
+    country = [None] * n
+    for i, s in enumerate(sources):
+        centroid = s["centroid"]
+        lat[i] = centroid["latitude"]
+        lon[i] = centroid["longitude"]
+        emissions[i] = s["emissionsQuantity"]
+        name[i] = s["name"]
+        sector[i] = s["sector"]
+        country[i] = s["country"]
+    return {
+        "lat": lat,
+        "lon": lon,
+        "emissions": emissions,
+        "name": np.array(name, dtype=str),
+        "sector": np.array(sector, dtype=str),
+        "country": np.array(country, dtype=str),
+    }
+
+
+def marker_sizes(emissions):
+    """Marker sizes proportional to emissions, clipped to a readable range."""
+    peak = emissions.max() if emissions.size else 0
+    if peak <= 0:
+        return np.full(emissions.shape, MIN_MARKER_SIZE, dtype=float)
+    return np.clip(emissions / peak * MAX_MARKER_SIZE, MIN_MARKER_SIZE, MAX_MARKER_SIZE)
+
+
+def sector_labels(sectors):
+    """Title-case sector labels, formatting each distinct sector once."""
+    unique, inverse = np.unique(sectors, return_inverse=True)
+    labels = np.array([u.replace("-", " ").title() for u in unique], dtype=str)
+    return labels[inverse]
+
+
+def hover_data(cols):
+    """Per-point ``customdata`` rows of name, sector label and country.
+
+    Emissions are not repeated here; the hover template reads them from
+    ``marker.color``.
+    """
+    return np.column_stack(
+        (cols["name"], sector_labels(cols["sector"]), cols["country"])
+    ).tolist()
+
+
+def marker_style():
+    """Marker attributes shared by every render of the sources map."""
+    return {
+        "colorscale": "RdYlBu_r",
+        "colorbar": {
+            "title": {"text": "Emissions Quantity", "side": "right"},
+            "thickness": 15,
+            "len": 0.6,
+            "outlinewidth": 0,
+            "ticks": "",
+        },
+        "opacity": 0.75,
+    }
+
+
+def map_layout():
+    """Layout of the sources map.
+
+    ``uirevision`` keeps the user's pan and zoom when the data changes.
+    """
+    return {
+        "map": {
+            "style": "open-street-map",
+            "center": {"lat": 20, "lon": 0},
+            "zoom": 1.3,
+        },
+        "margin": {"l": 0, "r": 0, "t": 10, "b": 10},
+        "height": 550,
+        "font": {"color": "#2a3f5f"},
+        "hoverlabel": {"align": "left"},
+        "uirevision": "sources-map",
+    }
+
+
+@BUILD_SECONDS.time(step="sources_map")
+def build_sources_map(sources):
+    """Build the sources Scattermap figure as a plain figure dict.
+
+    The dict is what ``go.Figure`` would serialize to, minus the default
+    template, and skips Plotly's per-property validation so it can go
+    straight to the JSON encoder.
+
+    Args:
+        sources: List of source summary dicts as returned by ``get_sources``.
+
+    Returns:
+        Figure dict with one Scattermap trace (none if ``sources`` is empty).
+    """
+    data = []
+
+    if sources:
+        cols = source_columns(sources)
+        marker = marker_style()
+        marker["size"] = marker_sizes(cols["emissions"]).round(1)
+        marker["color"] = cols["emissions"].round()
+        data.append(
+            {
+                "type": "scattermap",
+                "lat": cols["lat"].round(COORD_DECIMALS),
+                "lon": cols["lon"].round(COORD_DECIMALS),
+                "marker": marker,
+                "customdata": hover_data(cols),
+                "hovertemplate": HOVER_TEMPLATE,
+            }
+        )
+
+    return {"data": data, "layout": map_layout()}
+
+
+BIN_HOVER_TEMPLATE = (
+    "%{customdata:,} sources<br>"
+    "Emissions: %{marker.color:,.3~s} tonnes"
+    "<extra></extra>"
+)
+
+
+@BUILD_SECONDS.time(step="bins_map")
+def build_bins_map(bins):
+    """Build the sources map from grid cells produced by ``services.geo.bin_sources``.
+
+    Markers sit at each cell's emission-weighted centroid, sized by the
+    square root of the cell's share of the largest cell so dense regions do
+    not swamp the map.
+    """
+    data = []
+
+    if len(bins["count"]):
+        peak = bins["emissions"].max()
+        share = np.sqrt(bins["emissions"] / peak) if peak > 0 else np.zeros_like(bins["emissions"])
+        marker = marker_style()
+        marker["size"] = np.clip(share * MAX_MARKER_SIZE, MIN_MARKER_SIZE, MAX_MARKER_SIZE).round(1)
+        marker["color"] = bins["emissions"].round()
+        data.append(
+            {
+                "type": "scattermap",
+                "lat": bins["lat"].round(COORD_DECIMALS),
+                "lon": bins["lon"].round(COORD_DECIMALS),
+                "marker": marker,
+                "customdata": bins["count"],
+                "hovertemplate": BIN_HOVER_TEMPLATE,
+            }
+        )
+
+    return {"data": data, "layout": map_layout()}
+
+
+@BUILD_SECONDS.time(step="sources_store")
+def sources_store(sources):
+    """Compact columnar form of ``sources`` for the browser-side renderer.
+
+    Rows are sorted by emissions, highest first, so the client can take the
+    top N of any sector selection with a filter and a slice. Sectors are
+    sent once as keys and labels and referenced by index per row. The
+    marker style, hover template and layout travel with the data so
+    ``assets/sources_map.js`` only fills in the arrays.
+
+    Args:
+        sources: List of source summary dicts as returned by ``get_sources``.
+
+    Returns:
+        JSON-serializable dict for a ``dcc.Store``.
+    """
+    cols = source_columns(sources)
+    order = np.argsort(-cols["emissions"], kind="stable")
+    keys, sector_idx = np.unique(cols["sector"], return_inverse=True)
+    return {
+        "lat": cols["lat"][order].round(COORD_DECIMALS).tolist(),
+        "lon": cols["lon"][order].round(COORD_DECIMALS).tolist(),
+        "emissions": cols["emissions"][order].round().tolist(),
+        "name": cols["name"][order].tolist(),
+        "country": cols["country"][order].tolist(),
+        "sector": sector_idx[order].tolist(),
+        "sectorKeys": keys.tolist(),
+        "sectorLabels": [k.replace("-", " ").title() for k in keys.tolist()],
+        "sizeRange": [MIN_MARKER_SIZE, MAX_MARKER_SIZE],
+        "marker": marker_style(),
+        "hovertemplate": HOVER_TEMPLATE,
+        "layout": map_layout(),
+    }
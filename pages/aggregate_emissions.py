@@ -1,10 +1,25 @@
 """Aggregate Emissions page — Monthly emissions with filters and charts."""
 
 import dash
-from dash import html, dcc, callback, Input, Output
+from dash import (
+    html,
+    dcc,
+    callback,
+    clientside_callback,
+    ctx,
+    ClientsideFunction,
+    Input,
+    Output,
+    State,
+    Patch,
+)
 import plotly.graph_objects as go
 
-from services.api import get_emissions, get_gases, get_continents, SECTORS
+from services import cube, definitions, resilience
+from services.aggregation import MonthlyMatrix, ranked_summaries
+from services.api import get_emissions, prefetch_emissions, SECTORS
+from services.jobs import heavy_callback
+from services.metrics import BUILD_SECONDS
 
 dash.register_page(
     __name__,
@@ -13,310 +28,556 @@ dash.register_page(
     title="Aggregate Emissions — Emissions Sources",
 )
 
-# Pre-fetch filter options at import time
-_gases = get_gases()
-_continents = get_continents()
-
 # Common gas options (show most useful ones first)
 _priority_gases = ["co2e_100yr", "co2e_20yr", "co2", "ch4", "n2o"]
-_gas_options = [{"label": g, "value": g} for g in _priority_gases if g in _gases] + [
-    {"label": g, "value": g} for g in _gases if g not in _priority_gases
-]
 
-_continent_options = [{"label": "All", "value": "all"}] + [
-    {"label": c, "value": c} for c in sorted(_continents)
-]
+
+def _gas_options():
+    """Gas dropdown options from the current definitions snapshot."""
+    gases = definitions.gases()
+    return [{"label": g, "value": g} for g in _priority_gases if g in gases] + [
+        {"label": g, "value": g} for g in gases if g not in _priority_gases
+    ]
+
+
+def _continent_options():
+    """Continent dropdown options from the current definitions snapshot."""
+    return [{"label": "All", "value": "all"}] + [
+        {"label": c, "value": c} for c in sorted(definitions.continents())
+    ]
+
 
 _sector_options = [{"label": s.replace("-", " ").title(), "value": s} for s in SECTORS]
 
 _year_options = [{"label": str(y), "value": y} for y in range(2024, 2014, -1)]
 
 
-layout = html.Div(
-    [
-        # Back link
-        dcc.Link("← Back", href="/", className="back-link"),
-        # Title
-        html.H1("Aggregate Emissions", className="page-title"),
-        # Filters
-        html.Div(
-            [
-                html.Span("Filters", className="filters-label"),
-                html.Div(
-                    [
-                        html.Label("Year", className="filter-label"),
-                        dcc.Dropdown(
-                            id="agg-year",
-                            options=_year_options,
-                            value=2024,
-                            clearable=False,
-                            className="filter-dropdown",
-                        ),
-                    ],
-                    className="filter-group",
-                ),
-                html.Div(
-                    [
-                        html.Label("Continent", className="filter-label"),
-                        dcc.Dropdown(
-                            id="agg-continent",
-                            options=_continent_options,
-                            value="all",
-                            clearable=False,
-                            className="filter-dropdown",
-                        ),
-                    ],
-                    className="filter-group",
-                ),
-                html.Div(
-                    [
-                        html.Label("Gas", className="filter-label"),
-                        dcc.Dropdown(
-                            id="agg-gas",
-                            options=_gas_options,
-                            value="co2e_100yr",
-                            clearable=False,
-                            className="filter-dropdown filter-dropdown-wide",
-                        ),
-                    ],
-                    className="filter-group",
-                ),
-                html.Div(
-                    [
-                        html.Label("Sectors", className="filter-label"),
-                        dcc.Dropdown(
-                            id="agg-sectors",
-                            options=_sector_options,
-                            value=[],
-                            multi=True,
-                            placeholder="All",
-                            className="filter-dropdown filter-dropdown-wide",
-                        ),
-                    ],
-                    className="filter-group",
-                ),
-            ],
-            className="filters-row",
-        ),
-        # Loading indicator
-        dcc.Loading(
-            [
-                # Charts row
-                html.Div(
-                    [
-                        html.Div(
-                            [
-                                html.H3(id="agg-total-title", className="chart-title"),
-                                dcc.Graph(id="agg-total-chart", config={"displayModeBar": True}),
-                            ],
-                            className="chart-container",
-                        ),
-                        html.Div(
-                            [
-                                html.H3(
-                                    id="agg-sector-title",
-                                    className="chart-title",
-                                ),
-                                dcc.Graph(id="agg-sector-chart", config={"displayModeBar": True}),
-                            ],
-                            className="chart-container",
-                        ),
-                    ],
-                    className="charts-row",
-                ),
-            ],
-            type="circle",
-            color="#0d9488",
-        ),
-    ],
-    className="data-page",
+def layout(**kwargs):
+    """Build the page layout with dropdown options from the latest definitions."""
+    return html.Div(
+        [
+            # Back link
+            dcc.Link("← Back", href="/", className="back-link"),
+            # Title
+            html.H1("Aggregate Emissions", className="page-title"),
+            # Shown when the API is failing; the text is set by status.banner
+            html.Div(
+                id="agg-stale-banner",
+                className="stale-banner",
+                style={"display": "none"},
+            ),
+            # Filters
+            html.Div(
+                [
+                    html.Span("Filters", className="filters-label"),
+                    html.Div(
+                        [
+                            html.Label("Year", className="filter-label"),
+                            dcc.Dropdown(
+                                id="agg-year",
+                                options=_year_options,
+                                value=2024,
+                                clearable=False,
+                                className="filter-dropdown",
+                            ),
+                        ],
+                        className="filter-group",
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Compare years", className="filter-label"),
+                            dcc.Dropdown(
+                                id="agg-years",
+                                options=_year_options,
+                                value=[],
+                                multi=True,
+                                placeholder="Off",
+                                className="filter-dropdown filter-dropdown-wide",
+                            ),
+                        ],
+                        className="filter-group",
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Continent", className="filter-label"),
+                            dcc.Dropdown(
+                                id="agg-continent",
+                                options=_continent_options(),
+                                value="all",
+                                clearable=False,
+                                className="filter-dropdown",
+                            ),
+                        ],
+                        className="filter-group",
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Gas", className="filter-label"),
+                            dcc.Dropdown(
+                                id="agg-gas",
+                                options=_gas_options(),
+                                value="co2e_100yr",
+                                clearable=False,
+                                className="filter-dropdown filter-dropdown-wide",
+                            ),
+                        ],
+                        className="filter-group",
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Sectors", className="filter-label"),
+                            dcc.Dropdown(
+                                id="agg-sectors",
+                                options=_sector_options,
+                                value=[],
+                                multi=True,
+                                placeholder="All",
+                                className="filter-dropdown filter-dropdown-wide",
+                            ),
+                        ],
+                        className="filter-group",
+                    ),
+                ],
+                className="filters-row",
+            ),
+            # Loading indicator
+            dcc.Store(id="agg-data"),
+            dcc.Loading(
+                [
+                    # Charts row
+                    html.Div(
+                        [
+                            html.Div(
+                                [
+                                    html.H3(id="agg-total-title", className="chart-title"),
+                                    dcc.Graph(id="agg-total-chart", config={"displayModeBar": True}),
+                                ],
+                                className="chart-container",
+                            ),
+                            html.Div(
+                                [
+                                    html.H3(
+                                        id="agg-sector-title",
+                                        className="chart-title",
+                                    ),
+                                    dcc.Graph(id="agg-sector-chart", config={"displayModeBar": True}),
+                                ],
+                                className="chart-container",
+                            ),
+                        ],
+                        className="charts-row",
+                    ),
+                ],
+                type="circle",
+                color="#0d9488",
+            ),
+            # Multi-year comparison, filled in as years arrive
+            dcc.Store(id="agg-years-data"),
+            dcc.Interval(id="agg-years-poll", interval=500, disabled=True),
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            html.H3(id="agg-years-title", className="chart-title"),
+                            dcc.Graph(id="agg-years-chart", config={"displayModeBar": True}),
+                        ],
+                        className="chart-container",
+                    ),
+                    html.Div(
+                        [
+                            html.H3("Annual Totals", className="chart-title"),
+                            dcc.Graph(id="agg-annual-chart", config={"displayModeBar": True}),
+                        ],
+                        className="chart-container",
+                    ),
+                ],
+                id="agg-years-section",
+                className="charts-row",
+                style={"display": "none"},
+            ),
+        ],
+        className="data-page",
+    )
+
+
+_month_labels = [
+    "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+    "Jul", "Aug", "Sep", "Oct", "Nov", "Dec",
+]
+
+# Color palette for sectors
+_colors = [
+    "#0d9488", "#f59e0b", "#ef4444", "#8b5cf6", "#3b82f6",
+    "#ec4899", "#6366f1", "#14b8a6", "#f97316", "#84cc16",
+]
+
+_line_layout = dict(
+    xaxis_title="Month",
+    yaxis_title="Emissions (tonnes)",
+    template="plotly_white",
+    margin=dict(l=60, r=20, t=20, b=50),
+    height=380,
+    yaxis=dict(gridcolor="#f0f0f0"),
+    xaxis=dict(gridcolor="#f0f0f0"),
 )
 
 
-@callback(
-    [
-        Output("agg-total-chart", "figure"),
-        Output("agg-sector-chart", "figure"),
-        Output("agg-total-title", "children"),
-        Output("agg-sector-title", "children"),
-    ],
+@BUILD_SECONDS.time(step="emissions_store")
+def _compact(data, continent):
+    """Reduce an unfiltered emissions payload to what the charts need.
+
+    Sector timeseries become a month × sector matrix so the figure callbacks
+    can filter by sector without going back to the API. The annual bar keeps
+    the API's own sector summaries.
+    """
+    data = data or {}
+    totals = (data.get("totals") or {}).get("timeseries", [])
+    section = data.get("sectors") or {}
+    sectors = MonthlyMatrix.from_entries(section.get("timeseries", []))
+    keys, sums, percentages = ranked_summaries(section.get("summaries"), sectors)
+    return {
+        "continent": continent,
+        "totals": {
+            "months": [t["month"] for t in totals],
+            "values": [round(t["emissionsQuantity"]) for t in totals],
+        },
+        "sectors": sectors.to_dict(),
+        "summaries": {
+            "keys": keys,
+            "values": sums.round().tolist(),
+            "percentages": percentages.round(1).tolist(),
+        },
+    }
+
+
+@heavy_callback(
+    Output("agg-data", "data"),
     [
         Input("agg-year", "value"),
         Input("agg-continent", "value"),
         Input("agg-gas", "value"),
-        Input("agg-sectors", "value"),
     ],
 )
-def update_charts(year, continent, gas, sectors):
-    """Fetch emissions data and update both charts."""
+def load_emissions(_, year, continent, gas):
+    """Fetch unfiltered emissions for a year, continent and gas into the store."""
     continent_param = None if continent == "all" else continent
-    sector_param = sectors if sectors else None
-
-    data = get_emissions(
-        year=year, gas=gas, continent=continent_param, sector=sector_param
-    )
+    data = cube.query(year, gas, continent=continent_param)
+    if data is None:
+        data = get_emissions(year=year, gas=gas, continent=continent_param)
+    store = _compact(data, continent)
+    store["stale"] = resilience.is_stale()
+    store["degraded"] = resilience.degraded()
+    return store
+
+
+# A stale or degraded store anywhere on the page shows the banner.
+clientside_callback(
+    ClientsideFunction(namespace="status", function_name="banner"),
+    [Output("agg-stale-banner", "style"), Output("agg-stale-banner", "children")],
+    [
+        Input("agg-data", "data"),
+        Input("agg-years-data", "data"),
+    ],
+)
 
-    month_labels = [
-        "Jan", "Feb", "Mar", "Apr", "May", "Jun",
-        "Jul", "Aug", "Sep", "Oct", "Nov", "Dec",
-    ]
 
-    # Color palette for sectors
-    colors = [
-        "#0d9488", "#f59e0b", "#ef4444", "#8b5cf6", "#3b82f6",
-        "#ec4899", "#6366f1", "#14b8a6", "#f97316", "#84cc16",
+def _titles(store, sectors):
+    continent = (store or {}).get("continent", "all")
+    if sectors:
+        selected_label = ", ".join(s.replace("-", " ").title() for s in sectors)
+        return f"Total Emissions ({selected_label})", f"Sector Emissions ({selected_label})"
+    if continent != "all":
+        return f"Total Emissions ({continent})", f"Sector Emissions ({continent})"
+    return "Total Emissions", "Sector Emissions (All)"
+
+
+@BUILD_SECONDS.time(step="total_chart")
+def _total_traces(store, sectors):
+    """Line trace of monthly totals, summing only the selected sectors if any."""
+    if not store:
+        return []
+    if sectors:
+        matrix = MonthlyMatrix.from_dict(store["sectors"]).select(sectors)
+        if not len(matrix):
+            return []
+        months = matrix.months()
+        quantities = matrix.totals()
+    else:
+        months = store["totals"]["months"]
+        quantities = store["totals"]["values"]
+    if not len(months):
+        return []
+
+    return [
+        go.Scatter(
+            x=[_month_labels[m - 1] for m in months],
+            y=quantities,
+            mode="lines+markers",
+            line=dict(color="#0d9488", width=2.5),
+            marker=dict(size=6, color="#0d9488"),
+            fill="tozeroy",
+            fillcolor="rgba(13, 148, 136, 0.08)",
+            hovertemplate="<b>%{x}</b><br>%{y:,.0f} tonnes<extra></extra>",
+        )
     ]
 
-    has_sector_filter = sectors and len(sectors) > 0
-
-    # --- Total Emissions Line Chart ---
-    total_fig = go.Figure()
-
-    if data and has_sector_filter and "sectors" in data:
-        # When sectors are filtered, sum only the selected sectors' timeseries
-        sector_ts = data["sectors"].get("timeseries", [])
-        monthly_totals = {}
-        for entry in sector_ts:
-            if entry["sector"] in sectors:
-                month = entry["month"]
-                monthly_totals[month] = monthly_totals.get(month, 0) + entry["emissionsQuantity"]
-
-        if monthly_totals:
-            sorted_months = sorted(monthly_totals.keys())
-            x_labels = [month_labels[m - 1] for m in sorted_months]
-            quantities = [monthly_totals[m] for m in sorted_months]
 
-            total_fig.add_trace(
+@BUILD_SECONDS.time(step="sector_chart")
+def _sector_traces(store, sectors):
+    """Per-sector monthly lines when filtered, otherwise a ranked bar of all sectors."""
+    if not store:
+        return []
+    if sectors:
+        selected = MonthlyMatrix.from_dict(store["sectors"]).select(sectors)
+        x_labels = [_month_labels[m - 1] for m in selected.months()]
+        traces = []
+        for i, sector_key in enumerate(sectors):
+            y_vals = selected.row(sector_key)
+            if y_vals is None:
+                continue
+            color = _colors[i % len(_colors)]
+            traces.append(
                 go.Scatter(
                     x=x_labels,
-                    y=quantities,
+                    y=y_vals,
                     mode="lines+markers",
-                    line=dict(color="#0d9488", width=2.5),
-                    marker=dict(size=6, color="#0d9488"),
-                    fill="tozeroy",
-                    fillcolor="rgba(13, 148, 136, 0.08)",
-                    hovertemplate="<b>%{x}</b><br>%{y:,.0f} tonnes<extra></extra>",
+                    name=sector_key.replace("-", " ").title(),
+                    line=dict(color=color, width=2.5),
+                    marker=dict(size=6, color=color),
+                    hovertemplate=(
+                        "<b>%{fullData.name}</b><br>"
+                        "%{x}: %{y:,.0f} tonnes<extra></extra>"
+                    ),
                 )
             )
-    elif data and "totals" in data:
-        # No sector filter — use global totals
-        timeseries = data["totals"].get("timeseries", [])
-        months = [t["month"] for t in timeseries]
-        quantities = [t["emissionsQuantity"] for t in timeseries]
-        x_labels = [month_labels[m - 1] for m in months]
-
-        total_fig.add_trace(
-            go.Scatter(
-                x=x_labels,
-                y=quantities,
-                mode="lines+markers",
-                line=dict(color="#0d9488", width=2.5),
-                marker=dict(size=6, color="#0d9488"),
-                fill="tozeroy",
-                fillcolor="rgba(13, 148, 136, 0.08)",
-                hovertemplate="<b>%{x}</b><br>%{y:,.0f} tonnes<extra></extra>",
-            )
+        return traces
+
+    summaries = store["summaries"]
+    if not summaries["keys"]:
+        return []
+    return [
+        go.Bar(
+            x=summaries["values"],
+            y=[key.replace("-", " ").title() for key in summaries["keys"]],
+            orientation="h",
+            marker_color=_colors[: len(summaries["keys"])],
+            hovertemplate=(
+                "<b>%{y}</b><br>"
+                "%{x:,.0f} tonnes<br>"
+                "<extra></extra>"
+            ),
+            customdata=summaries["percentages"],
+            texttemplate="%{customdata:.1f}%",
+            textposition="auto",
+            textfont=dict(color="white", size=11),
         )
+    ]
 
-    total_fig.update_layout(
-        xaxis_title="Month",
-        yaxis_title="Emissions (tonnes)",
-        template="plotly_white",
-        margin=dict(l=60, r=20, t=20, b=50),
-        height=380,
-        yaxis=dict(gridcolor="#f0f0f0"),
-        xaxis=dict(gridcolor="#f0f0f0"),
-    )
-
-    # --- Second Chart: Bar (all sectors) or Line (filtered sectors) ---
-    sector_fig = go.Figure()
-
-    # Build titles
-    continent_label = continent if continent != "all" else "All"
 
+def _sector_layout(has_sector_filter):
+    """Layout keys that differ between the line and bar variants of the sector chart."""
     if has_sector_filter:
-        selected_label = ", ".join(s.replace("-", " ").title() for s in sectors)
-        total_title = f"Total Emissions ({selected_label})"
-        sector_title = f"Sector Emissions ({selected_label})"
-
-        # Show a multi-line chart with each selected sector's monthly trend
-        if data and "sectors" in data:
-            sector_ts = data["sectors"].get("timeseries", [])
-            for i, sector_key in enumerate(sectors):
-                entries = sorted(
-                    [e for e in sector_ts if e["sector"] == sector_key],
-                    key=lambda e: e["month"],
-                )
-                if entries:
-                    x_labels = [month_labels[e["month"] - 1] for e in entries]
-                    y_vals = [e["emissionsQuantity"] for e in entries]
-                    color = colors[i % len(colors)]
-                    sector_fig.add_trace(
-                        go.Scatter(
-                            x=x_labels,
-                            y=y_vals,
-                            mode="lines+markers",
-                            name=sector_key.replace("-", " ").title(),
-                            line=dict(color=color, width=2.5),
-                            marker=dict(size=6, color=color),
-                            hovertemplate=(
-                                "<b>%{fullData.name}</b><br>"
-                                "%{x}: %{y:,.0f} tonnes<extra></extra>"
-                            ),
-                        )
-                    )
-
-        sector_fig.update_layout(
-            xaxis_title="Month",
-            yaxis_title="Emissions (tonnes)",
-            template="plotly_white",
+        return dict(
+            xaxis=dict(title=dict(text="Month"), gridcolor="#f0f0f0"),
+            yaxis=dict(title=dict(text="Emissions (tonnes)"), gridcolor="#f0f0f0"),
             margin=dict(l=60, r=20, t=20, b=50),
-            height=380,
-            yaxis=dict(gridcolor="#f0f0f0"),
-            xaxis=dict(gridcolor="#f0f0f0"),
             legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
         )
-    else:
-        total_title = f"Total Emissions ({continent})" if continent != "all" else "Total Emissions"
-        sector_title = f"Sector Emissions ({continent})" if continent != "all" else "Sector Emissions (All)"
-
-        # Show the bar chart with all sector summaries
-        if data and "sectors" in data:
-            summaries = data["sectors"].get("summaries", [])
-            summaries_sorted = sorted(
-                summaries, key=lambda s: s["emissionsQuantity"], reverse=True
-            )
+    return dict(
+        xaxis=dict(title=dict(text="Emissions (tonnes)"), gridcolor="#f0f0f0"),
+        yaxis=dict(autorange="reversed", gridcolor="#f0f0f0"),
+        margin=dict(l=180, r=20, t=20, b=50),
+        legend=dict(),
+    )
+
+
+def _sectors_only_changed():
+    return "agg-data.data" not in ctx.triggered_prop_ids
 
-            sector_names = [
-                s["sector"].replace("-", " ").title() for s in summaries_sorted
-            ]
-            sector_quantities = [s["emissionsQuantity"] for s in summaries_sorted]
-            sector_percentages = [s["percentage"] for s in summaries_sorted]
-
-            sector_fig.add_trace(
-                go.Bar(
-                    x=sector_quantities,
-                    y=sector_names,
-                    orientation="h",
-                    marker_color=colors[: len(sector_names)],
-                    hovertemplate=(
-                        "<b>%{y}</b><br>"
-                        "%{x:,.0f} tonnes<br>"
-                        "<extra></extra>"
-                    ),
-                    text=[f"{p:.1f}%" for p in sector_percentages],
-                    textposition="auto",
-                    textfont=dict(color="white", size=11),
-                )
-            )
 
-        sector_fig.update_layout(
-            xaxis_title="Emissions (tonnes)",
-            template="plotly_white",
-            margin=dict(l=180, r=20, t=20, b=50),
-            height=380,
-            yaxis=dict(autorange="reversed", gridcolor="#f0f0f0"),
-            xaxis=dict(gridcolor="#f0f0f0"),
+@callback(
+    [
+        Output("agg-total-chart", "figure"),
+        Output("agg-total-title", "children"),
+    ],
+    [
+        Input("agg-data", "data"),
+        Input("agg-sectors", "value"),
+    ],
+)
+def update_total_chart(store, sectors):
+    """Monthly total line chart; sector toggles only patch the trace."""
+    traces = _total_traces(store, sectors)
+    title = _titles(store, sectors)[0]
+    if _sectors_only_changed():
+        patch = Patch()
+        patch["data"] = traces
+        return patch, title
+
+    fig = go.Figure(traces)
+    fig.update_layout(**_line_layout)
+    return fig, title
+
+
+@callback(
+    [
+        Output("agg-sector-chart", "figure"),
+        Output("agg-sector-title", "children"),
+    ],
+    [
+        Input("agg-data", "data"),
+        Input("agg-sectors", "value"),
+    ],
+)
+def update_sector_chart(store, sectors):
+    """Sector bar chart, or per-sector lines when sectors are selected."""
+    traces = _sector_traces(store, sectors)
+    title = _titles(store, sectors)[1]
+    if _sectors_only_changed():
+        patch = Patch()
+        patch["data"] = traces
+        for key, value in _sector_layout(bool(sectors)).items():
+            patch["layout"][key] = value
+        return patch, title
+
+    fig = go.Figure(traces)
+    fig.update_layout(
+        template="plotly_white", height=380, **_sector_layout(bool(sectors))
+    )
+    return fig, title
+
+
+@callback(
+    [
+        Output("agg-years-data", "data"),
+        Output("agg-years-poll", "disabled"),
+    ],
+    [
+        Input("agg-years", "value"),
+        Input("agg-continent", "value"),
+        Input("agg-gas", "value"),
+        Input("agg-years-poll", "n_intervals"),
+    ],
+    State("agg-years-data", "data"),
+)
+def load_years(years, continent, gas, _, store):
+    """Fetch the compared years concurrently, adding each one as it arrives.
+
+    Filter changes start a new store; polls only ask for the years still
+    pending and patch them in.
+    """
+    if not years:
+        return None, True
+    continent_param = None if continent == "all" else continent
+    polling = ctx.triggered_id == "agg-years-poll" and store is not None
+    wanted = store["pending"] if polling else sorted(years)
+
+    found, missing = {}, []
+    for year in wanted:
+        data = cube.query(year, gas, continent=continent_param)
+        if data is None:
+            missing.append(year)
+        else:
+            found[year] = data
+    ready, pending = prefetch_emissions(missing, gas=gas, continent=continent_param)
+    found.update(ready)
+    compacted = {str(y): _compact(data, continent) for y, data in found.items()}
+
+    if polling:
+        patch = Patch()
+        for year, value in compacted.items():
+            patch["years"][year] = value
+        patch["pending"] = pending
+        if resilience.is_stale():
+            patch["stale"] = True
+        if resilience.degraded():
+            patch["degraded"] = True
+        return patch, not pending
+    store = {"continent": continent, "years": compacted, "pending": pending}
+    store["stale"] = resilience.is_stale()
+    store["degraded"] = resilience.degraded()
+    return store, not pending
+
+
+def _year_series(entry, sectors):
+    """Monthly ``(months, values)`` for one year's compact store entry."""
+    if sectors:
+        matrix = MonthlyMatrix.from_dict(entry["sectors"]).select(sectors)
+        return matrix.months().tolist(), matrix.totals().tolist()
+    return entry["totals"]["months"], entry["totals"]["values"]
+
+
+@BUILD_SECONDS.time(step="year_charts")
+def _year_traces(store, sectors):
+    """Monthly overlay lines and annual total bars, one per loaded year."""
+    lines, years, annual = [], [], []
+    for i, year in enumerate(sorted(store["years"], key=int)):
+        months, values = _year_series(store["years"][year], sectors)
+        if not len(months):
+            continue
+        color = _colors[i % len(_colors)]
+        lines.append(
+            go.Scatter(
+                x=[_month_labels[m - 1] for m in months],
+                y=values,
+                mode="lines+markers",
+                name=year,
+                line=dict(color=color, width=2),
+                marker=dict(size=5, color=color),
+                hovertemplate="<b>%{fullData.name}</b><br>%{x}: %{y:,.0f} tonnes<extra></extra>",
+            )
         )
+        years.append(year)
+        annual.append(sum(values))
+    bars = [
+        go.Bar(
+            x=years,
+            y=annual,
+            marker_color="#0d9488",
+            hovertemplate="<b>%{x}</b><br>%{y:,.0f} tonnes<extra></extra>",
+        )
+    ]
+    return lines, bars
+
+
+@callback(
+    [
+        Output("agg-years-chart", "figure"),
+        Output("agg-annual-chart", "figure"),
+        Output("agg-years-title", "children"),
+        Output("agg-years-section", "style"),
+    ],
+    [
+        Input("agg-years-data", "data"),
+        Input("agg-sectors", "value"),
+    ],
+)
+def update_year_charts(store, sectors):
+    """Year-over-year monthly overlay and annual totals for the compared years."""
+    if not store:
+        return go.Figure(), go.Figure(), "", {"display": "none"}
+
+    lines, bars = _year_traces(store, sectors)
+    line_fig = go.Figure(lines)
+    line_fig.update_layout(
+        **_line_layout,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
+    )
+    bar_fig = go.Figure(bars)
+    bar_fig.update_layout(
+        template="plotly_white",
+        height=380,
+        margin=dict(l=60, r=20, t=20, b=50),
+        xaxis=dict(type="category", title=dict(text="Year")),
+        yaxis=dict(title=dict(text="Emissions (tonnes)"), gridcolor="#f0f0f0"),
+    )
 
-    return total_fig, sector_fig, total_title, sector_title
+    title = "Monthly Emissions by Year"
+    if sectors:
+        title += f" ({', '.join(s.replace('-', ' ').title() for s in sectors)})"
+    elif store.get("continent", "all") != "all":
+        title += f" ({store['continent']})"
+    if store["pending"]:
+        loaded = len(store["years"])
+        title += f" — loading {loaded} of {loaded + len(store['pending'])}…"
+    return line_fig, bar_fig, title, {}
@@ -1,11 +1,21 @@
 """Sources Ranked by Emissions — Scattergeo map page."""
 
 import dash
-from dash import html, dcc, callback, Input, Output
-import plotly.graph_objects as go
-import pandas as pd
+from dash import (
+    html,
+    dcc,
+    callback,
+    clientside_callback,
+    ClientsideFunction,
+    Input,
+    Output,
+    State,
+)
 
-from services.api import get_sources, get_gases, SECTORS
+from figures.sources_map import build_bins_map, build_sources_map, sources_store
+from services import definitions, geo, resilience
+from services.api import get_sources_by_sector, SECTORS
+from services.jobs import heavy_callback
 
 dash.register_page(
     __name__,
@@ -14,12 +24,16 @@ dash.register_page(
     title="Sources Ranked by Emissions — Emissions Sources",
 )
 
-# Pre-fetch gas options
-_gases = get_gases()
 _priority_gases = ["co2e_100yr", "co2e_20yr", "co2", "ch4", "n2o"]
-_gas_options = [{"label": g, "value": g} for g in _priority_gases if g in _gases] + [
-    {"label": g, "value": g} for g in _gases if g not in _priority_gases
-]
+
+
+def _gas_options():
+    """Gas dropdown options from the current definitions snapshot."""
+    gases = definitions.gases()
+    return [{"label": g, "value": g} for g in _priority_gases if g in gases] + [
+        {"label": g, "value": g} for g in gases if g not in _priority_gases
+    ]
+
 
 _sector_options = [{"label": s.replace("-", " ").title(), "value": s} for s in SECTORS]
 
@@ -30,159 +44,214 @@ _limit_options = [
     {"label": "100", "value": 100},
     {"label": "200", "value": 200},
     {"label": "500", "value": 500},
+    {"label": "5,000", "value": 5000},
+    {"label": "20,000", "value": 20000},
 ]
 
+# Every (year, gas) load fetches this many sources per sector, enough for
+# the browser to answer any limit up to it and any sector selection on its
+# own. Once the map is panned or zoomed, or for larger limits, the server
+# answers from its spatial index for the current viewport.
+_max_limit = 500
 
-layout = html.Div(
-    [
-        # Back link
-        dcc.Link("← Back", href="/", className="back-link"),
-        # Title
-        html.H1("Sources Ranked By Emissions", className="page-title"),
-        # Filters
-        html.Div(
-            [
-                html.Span("Filters", className="filters-label"),
-                html.Div(
-                    [
-                        html.Label("Year", className="filter-label"),
-                        dcc.Dropdown(
-                            id="src-year",
-                            options=_year_options,
-                            value=2024,
-                            clearable=False,
-                            className="filter-dropdown",
-                        ),
-                    ],
-                    className="filter-group",
-                ),
-                html.Div(
-                    [
-                        html.Label("Gas", className="filter-label"),
-                        dcc.Dropdown(
-                            id="src-gas",
-                            options=_gas_options,
-                            value="co2e_100yr",
-                            clearable=False,
-                            className="filter-dropdown filter-dropdown-wide",
-                        ),
-                    ],
-                    className="filter-group",
-                ),
-                html.Div(
-                    [
-                        html.Label("Sectors", className="filter-label"),
-                        dcc.Dropdown(
-                            id="src-sectors",
-                            options=_sector_options,
-                            value=[],
-                            multi=True,
-                            placeholder="All",
-                            className="filter-dropdown filter-dropdown-wide",
-                        ),
-                    ],
-                    className="filter-group",
-                ),
+
+def layout(**kwargs):
+    """Build the page layout with dropdown options from the latest definitions."""
+    return html.Div(
+        [
+            # Back link
+            dcc.Link("← Back", href="/", className="back-link"),
+            # Title
+            html.H1("Sources Ranked By Emissions", className="page-title"),
+            # Shown when the API is failing; the text is set by status.banner
+            html.Div(
+                id="src-stale-banner",
+                className="stale-banner",
+                style={"display": "none"},
+            ),
+            # Filters
+            html.Div(
+                [
+                    html.Span("Filters", className="filters-label"),
+                    html.Div(
+                        [
+                            html.Label("Year", className="filter-label"),
+                            dcc.Dropdown(
+                                id="src-year",
+                                options=_year_options,
+                                value=2024,
+                                clearable=False,
+                                className="filter-dropdown",
+                            ),
+                        ],
+                        className="filter-group",
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Gas", className="filter-label"),
+                            dcc.Dropdown(
+                                id="src-gas",
+                                options=_gas_options(),
+                                value="co2e_100yr",
+                                clearable=False,
+                                className="filter-dropdown filter-dropdown-wide",
+                            ),
+                        ],
+                        className="filter-group",
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Sectors", className="filter-label"),
+                            dcc.Dropdown(
+                                id="src-sectors",
+                                options=_sector_options,
+                                value=[],
+                                multi=True,
+                                placeholder="All",
+                                className="filter-dropdown filter-dropdown-wide",
+                            ),
+                        ],
+                        className="filter-group",
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Limit", className="filter-label"),
+                            dcc.Dropdown(
+                                id="src-limit",
+                                options=_limit_options,
+                                value=500,
+                                clearable=False,
+                                className="filter-dropdown",
+                            ),
+                        ],
+                        className="filter-group",
+                    ),
+                ],
+                className="filters-row",
+            ),
+            # Progress of a background map job, empty otherwise
+            html.Div(id="src-progress", className="job-progress"),
+            # Loading + Map
+            dcc.Loading(
                 html.Div(
                     [
-                        html.Label("Limit", className="filter-label"),
-                        dcc.Dropdown(
-                            id="src-limit",
-                            options=_limit_options,
-                            value=500,
-                            clearable=False,
-                            className="filter-dropdown",
+                        dcc.Store(id="src-data"),
+                        dcc.Store(id="src-viewport"),
+                        dcc.Store(id="src-view-request"),
+                        dcc.Store(id="src-view"),
+                        dcc.Graph(
+                            id="sources-map",
+                            config={"displayModeBar": True, "scrollZoom": True},
                         ),
                     ],
-                    className="filter-group",
+                    className="map-container",
                 ),
-            ],
-            className="filters-row",
-        ),
-        # Loading + Map
-        dcc.Loading(
-            html.Div(
-                [
-                    dcc.Graph(
-                        id="sources-map",
-                        config={"displayModeBar": True, "scrollZoom": True},
-                    ),
-                ],
-                className="map-container",
+                type="circle",
+                color="#0d9488",
             ),
-            type="circle",
-            color="#0d9488",
-        ),
+        ],
+        className="data-page",
+    )
+
+
+@callback(
+    Output("src-data", "data"),
+    [
+        Input("src-year", "value"),
+        Input("src-gas", "value"),
     ],
-    className="data-page",
 )
+def load_sources(year, gas):
+    """Fetch the per-sector top sources for a year and gas into the browser."""
+    rankings = get_sources_by_sector(year=year, gas=gas, limit=_max_limit)
+    store = sources_store([s for sources in rankings.values() for s in sources])
+    store["maxLimit"] = _max_limit
+    store["stale"] = resilience.is_stale()
+    store["degraded"] = resilience.degraded()
+    return store
 
 
-@callback(
-    Output("sources-map", "figure"),
+clientside_callback(
+    ClientsideFunction(namespace="status", function_name="banner"),
+    [Output("src-stale-banner", "style"), Output("src-stale-banner", "children")],
+    [Input("src-data", "data"), Input("src-view", "data")],
+)
+
+
+# Pan/zoom is reduced to a rounded viewport in the browser so only real
+# view changes reach the server.
+clientside_callback(
+    ClientsideFunction(namespace="sources", function_name="viewport"),
+    Output("src-viewport", "data"),
+    Input("sources-map", "relayoutData"),
+    State("src-viewport", "data"),
+)
+
+
+# Only filters the browser cannot apply itself reach the server: the gate
+# writes a request once the map has been moved or the limit exceeds what
+# src-data holds, and clears it when the browser can render again.
+clientside_callback(
+    ClientsideFunction(namespace="sources", function_name="viewRequest"),
+    Output("src-view-request", "data"),
     [
         Input("src-year", "value"),
         Input("src-gas", "value"),
         Input("src-sectors", "value"),
         Input("src-limit", "value"),
+        Input("src-viewport", "data"),
+        Input("src-data", "data"),
     ],
+    State("src-view-request", "data"),
 )
-def update_map(year, gas, sectors, limit):
-    """Fetch ranked sources and plot on a Scattermap."""
-    sector_param = sectors if sectors else None
-    sources = get_sources(year=year, gas=gas, sectors=sector_param, limit=limit)
-
-    fig = go.Figure()
-
-    if sources:
-        df = pd.DataFrame(sources)
-        df = df.assign(
-            lat=df["centroid"].apply(lambda c: c["latitude"]),
-            lon=df["centroid"].apply(lambda c: c["longitude"]),
-            emissions_fmt=df["emissionsQuantity"].apply(
-                lambda x: f"{x:,.0f}" if x < 1e6 else f"{x / 1e6:,.1f}M"
-            ),
-        )
-
-        fig.add_trace(
-            go.Scattermap(
-                lat=df["lat"],
-                lon=df["lon"],
-                marker=dict(
-                    size=df["emissionsQuantity"].apply(
-                        lambda x: max(8, min(35, (x / df["emissionsQuantity"].max()) * 35))
-                    ),
-                    color=df["emissionsQuantity"],
-                    colorscale="RdYlBu_r",
-                    colorbar=dict(
-                        title="Emissions Quantity",
-                        titleside="right",
-                        thickness=15,
-                        len=0.6,
-                    ),
-                    opacity=0.75,
-                ),
-                text=df.apply(
-                    lambda row: (
-                        f"{row['name']}\n"
-                        f"Sector: {row['sector'].replace('-', ' ').title()}\n"
-                        f"Country: {row['country']}\n"
-                        f"Emissions: {row['emissions_fmt']} tonnes"
-                    ),
-                    axis=1,
-                ),
-                hoverinfo="text",
-            )
-        )
-
-    fig.update_layout(
-        map=dict(
-            style="open-street-map",
-            center=dict(lat=20, lon=0),
-            zoom=1.3,
-        ),
-        margin=dict(l=0, r=0, t=10, b=10),
-        height=550,
-    )
 
-    return fig
+
+@heavy_callback(
+    Output("src-view", "data"),
+    Input("src-view-request", "data"),
+    progress=Output("src-progress", "children"),
+    progress_default="",
+)
+def update_map_view(set_progress, request):
+    """Top sources inside the current map viewport, from the spatial index.
+
+    ``request`` holds the year, gas, sectors, limit and viewport, or is
+    ``None`` once the browser renders from src-data again, which clears the
+    server-side view. The top ``limit`` sources in view are drawn
+    individually when there are few enough of them, and aggregated into a
+    grid sized for the current zoom beyond that. The figure is returned
+    with the same ``stale`` and ``degraded`` flags as the stores, so the
+    page can show the banner.
+    """
+    if request is None:
+        return None
+    year, gas = request["year"], request["gas"]
+    sectors, limit, viewport = request["sectors"], request["limit"], request["viewport"]
+    set_progress(f"Loading the top {geo.INDEX_SIZE:,} sources…")
+    source_set = geo.source_set(year, gas)
+    set_progress("Finding sources in view…")
+    rows = source_set.index.query(geo.viewport_bounds(viewport), sectors, limit)
+    set_progress(f"Drawing {len(rows):,} sources…")
+    if len(rows) <= geo.MAX_MARKERS:
+        figure = build_sources_map(source_set.subset(rows))
+    else:
+        zoom = (viewport or {}).get("zoom", geo.DEFAULT_ZOOM)
+        figure = build_bins_map(geo.bin_sources(source_set, rows, zoom))
+    return {
+        "figure": figure,
+        "stale": resilience.is_stale(),
+        "degraded": resilience.degraded(),
+    }
+
+
+# Limit and sector changes are applied in the browser (assets/sources_map.js).
+clientside_callback(
+    ClientsideFunction(namespace="sources", function_name="render"),
+    Output("sources-map", "figure"),
+    [
+        Input("src-data", "data"),
+        Input("src-view", "data"),
+        Input("src-sectors", "value"),
+        Input("src-limit", "value"),
+    ],
+)
@@ -0,0 +1,140 @@
+"""Dense month × key matrices built from emissions timeseries entries."""
+
+import numpy as np
+
+MONTHS = 12
+
+
+class MonthlyMatrix:
+    """Monthly emissions, one row per sector (or subsector).
+
+    Args:
+        keys: Row labels, e.g. sector names.
+        values: Array of shape ``(len(keys), 12)``.
+        present: Boolean array of 12 marking months that had any entry.
+        parents: Optional parent label per row (the sector of a subsector).
+    """
+
+    def __init__(self, keys, values, present, parents=None):
+        self.keys = list(keys)
+        self.values = np.asarray(values, dtype=float).reshape(len(self.keys), MONTHS)
+        self.present = np.asarray(present, dtype=bool)
+        self.parents = list(parents) if parents is not None else None
+        self._index = {k: i for i, k in enumerate(self.keys)}
+
+    @classmethod
+    def from_entries(cls, entries, key="sector", parent_key=None):
+        """Build the matrix from API timeseries entries without per-key scans.
+
+        Args:
+            entries: Dicts with ``month`` (1-12), ``emissionsQuantity`` and
+                ``key``.
+            key: Entry field that labels the row.
+            parent_key: Optional entry field recorded as each row's parent,
+                e.g. ``"sector"`` for subsector entries.
+        """
+        labels = [e[key] for e in entries]
+        index = {label: i for i, label in enumerate(dict.fromkeys(labels))}
+        rows = np.fromiter((index[label] for label in labels), int, len(labels))
+        months = np.fromiter((e["month"] for e in entries), int, len(labels)) - 1
+        quantities = np.fromiter(
+            (e["emissionsQuantity"] for e in entries), float, len(labels)
+        )
+        parents = None
+        if parent_key:
+            first = {}
+            for e in entries:
+                first.setdefault(e[key], e.get(parent_key))
+            parents = [first[label] for label in index]
+
+        values = np.bincount(
+            rows * MONTHS + months, weights=quantities, minlength=len(index) * MONTHS
+        )
+        present = np.bincount(months, minlength=MONTHS) > 0
+        return cls(index, values, present, parents)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def months(self):
+        """1-based numbers of the months present."""
+        return np.flatnonzero(self.present) + 1
+
+    def row(self, key):
+        """Monthly values for ``key`` over the present months, or ``None``."""
+        i = self._index.get(key)
+        return None if i is None else self.values[i, self.present]
+
+    def select(self, keys):
+        """Sub-matrix of ``keys`` in the given order; unknown keys are skipped."""
+        picked = [self._index[k] for k in keys if k in self._index]
+        return MonthlyMatrix(
+            [self.keys[i] for i in picked],
+            self.values[picked],
+            self.present,
+            [self.parents[i] for i in picked] if self.parents is not None else None,
+        )
+
+    def children(self, parent):
+        """Rows whose parent is ``parent``, e.g. the subsectors of a sector."""
+        if self.parents is None:
+            return self.select([])
+        return self.select([k for k, p in zip(self.keys, self.parents) if p == parent])
+
+    def totals(self):
+        """Sum over rows for each present month."""
+        return self.values[:, self.present].sum(axis=0)
+
+    def summaries(self):
+        """Annual sum per row and its share of the matrix total, in percent."""
+        sums = self.values.sum(axis=1)
+        grand = sums.sum()
+        percentages = sums / grand * 100 if grand else np.zeros_like(sums)
+        return sums, percentages
+
+    def to_dict(self):
+        """Compact JSON-serializable form with whole-tonne values."""
+        data = {
+            "keys": self.keys,
+            "months": self.months().tolist(),
+            "values": self.values[:, self.present].round().tolist(),
+        }
+        if self.parents is not None:
+            data["parents"] = self.parents
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        present = np.zeros(MONTHS, dtype=bool)
+        month_idx = np.asarray(data["months"], dtype=int) - 1
+        present[month_idx] = True
+        values = np.zeros((len(data["keys"]), MONTHS))
+        if len(data["keys"]):
+            values[:, month_idx] = data["values"]
+        return cls(data["keys"], values, present, data.get("parents"))
+
+
+def ranked_summaries(entries, matrix):
+    """Annual ``(keys, quantities, percentages)`` per row, largest first.
+
+    Uses the API's ``summaries`` entries when there are any, so the numbers
+    match what Climate Trace reports even where they differ from the sum
+    of the monthly timeseries (partial months, rounding). Otherwise they
+    are computed from ``matrix``, leaving out rows with no emissions.
+
+    Args:
+        entries: API summary dicts with ``emissionsQuantity``, ``percentage``
+            and the row key under ``sector``.
+        matrix: ``MonthlyMatrix`` of the same payload's timeseries.
+    """
+    if entries:
+        keys = [e["sector"] for e in entries]
+        sums = np.array([e["emissionsQuantity"] for e in entries], dtype=float)
+        percentages = np.array([e.get("percentage") or 0.0 for e in entries], dtype=float)
+    else:
+        sums, percentages = matrix.summaries()
+        keep = np.flatnonzero(sums)
+        keys = [matrix.keys[i] for i in keep]
+        sums, percentages = sums[keep], percentages[keep]
+    order = np.argsort(-sums, kind="stable")
+    return [keys[i] for i in order], sums[order], percentages[order]
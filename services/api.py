@@ -1,8 +1,111 @@
 """Climate Trace API client for the Emissions Sources dashboard."""
 
+import contextvars
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
-BASE_URL = "https://api.climatetrace.org/v7"
+from services import metrics, resilience, scheduler as sched, snapshot
+from services.cache import MISS, ResponseCache, make_key
+from services.client import ClimateTraceClient
+from services.ranking import merge_top_k
+
+BASE_URL = os.environ.get("CLIMATE_TRACE_BASE_URL", "https://api.climatetrace.org/v7")
+
+# "api" queries Climate Trace; "snapshot" reads the local store written by
+# ``python -m services.ingest``.
+BACKEND = os.environ.get("CLIMATE_TRACE_BACKEND", "api")
+
+# Upstream requests per second shared by all workers on this host, off by
+# default. Enable it when Climate Trace starts answering 429s: set it a
+# little under the allowed rate and the burst to about what one page load
+# fans out to (a ranked map with sector filters takes one request per
+# sector), or callbacks queue and time out. RATE_RESERVE tokens of the
+# burst are held back for interactive requests, so cache refreshes and
+# ingestion in any worker cannot starve callbacks. The deadlines are how
+# long interactive and background requests may queue for a token.
+RATE_LIMIT = float(os.environ.get("CLIMATE_TRACE_RATE_LIMIT", "0"))
+RATE_BURST = int(os.environ.get("CLIMATE_TRACE_RATE_BURST", "20"))
+RATE_RESERVE = int(os.environ.get("CLIMATE_TRACE_RATE_RESERVE", "5"))
+RATE_PATH = os.environ.get(
+    "CLIMATE_TRACE_RATE_PATH",
+    os.path.join(tempfile.gettempdir(), "climatetrace-ratelimit"),
+)
+QUEUE_DEADLINE = float(os.environ.get("CLIMATE_TRACE_QUEUE_DEADLINE", "10"))
+BACKGROUND_QUEUE_DEADLINE = float(
+    os.environ.get("CLIMATE_TRACE_BACKGROUND_QUEUE_DEADLINE", "120")
+)
+
+scheduler = sched.RequestScheduler(
+    sched.TokenBucket(RATE_LIMIT, RATE_BURST, RATE_PATH or None, RATE_RESERVE)
+    if RATE_LIMIT > 0
+    else None,
+    {sched.INTERACTIVE: QUEUE_DEADLINE, sched.BACKGROUND: BACKGROUND_QUEUE_DEADLINE},
+)
+
+# Consecutive upstream failures that open the circuit, and seconds it stays
+# open before one probe request is let through.
+BREAKER_THRESHOLD = int(os.environ.get("CLIMATE_TRACE_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.environ.get("CLIMATE_TRACE_BREAKER_RESET", "30"))
+
+breaker = resilience.CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+client = ClimateTraceClient(BASE_URL, scheduler=scheduler, breaker=breaker)
+cache = ResponseCache()
+
+_CACHE_EVENTS = {
+    "hits",
+    "disk_hits",
+    "stale_hits",
+    "misses",
+    "evictions",
+    "refreshes",
+    "refresh_errors",
+    "coalesced",
+}
+metrics.Collected(
+    "climatetrace_cache_events_total",
+    "Response cache lookups and maintenance events.",
+    lambda: {(k,): v for k, v in cache.stats().items() if k in _CACHE_EVENTS},
+    ["event"],
+    kind="counter",
+)
+metrics.Collected(
+    "climatetrace_cache_hit_ratio",
+    "Share of response cache lookups served without an upstream call.",
+    lambda: cache.stats()["hit_ratio"],
+)
+metrics.Collected(
+    "climatetrace_upstream_queue_depth",
+    "Upstream requests waiting for a rate-limit token.",
+    lambda: {(name,): n for name, n in scheduler.depth().items()},
+    ["priority"],
+)
+metrics.Collected(
+    "climatetrace_breaker_state",
+    "Upstream circuit breaker state: 0 closed, 1 half-open, 2 open.",
+    breaker.state_value,
+)
+metrics.Collected(
+    "climatetrace_cache_entries",
+    "Responses held in the in-memory cache tier.",
+    lambda: cache.stats()["size"],
+)
+
+# Bulk source pulls (``iter_sources``) page through results this many at a
+# time, with at most PAGE_WORKERS pages in flight.
+PAGE_SIZE = int(os.environ.get("CLIMATE_TRACE_PAGE_SIZE", "1000"))
+PAGE_WORKERS = int(os.environ.get("CLIMATE_TRACE_PAGE_WORKERS", "4"))
+PAGE_ATTEMPTS = 3
+
+# Sector-filtered rankings are cached per single sector at (at least) this
+# depth and merged locally, so any sector combination up to this limit is
+# answered without another upstream call.
+SECTOR_TOP_K = int(os.environ.get("CLIMATE_TRACE_SECTOR_TOP_K", "500"))
 
 SECTORS = [
     "mineral-extraction",
@@ -18,28 +121,170 @@ SECTORS = [
 ]
 
 
-def get_gases():
-    """Fetch all available gas types."""
+def get_gases(fallback=True):
+    """Fetch all available gas types.
+
+    Args:
+        fallback: Return a default list on error instead of raising.
+    """
     try:
-        response = requests.get(f"{BASE_URL}/definitions/gases", timeout=15)
-        response.raise_for_status()
-        return response.json()
+        return client.get_json("/definitions/gases", timeout=15)
     except requests.RequestException as e:
+        if not fallback:
+            raise
         print(f"Error fetching gases: {e}")
         return ["co2e_100yr", "co2e_20yr", "co2", "ch4", "n2o"]
 
 
-def get_continents():
-    """Fetch all available continents."""
+def get_continents(fallback=True):
+    """Fetch all available continents.
+
+    Args:
+        fallback: Return a default list on error instead of raising.
+    """
     try:
-        response = requests.get(f"{BASE_URL}/definitions/continents", timeout=15)
-        response.raise_for_status()
-        return [c for c in response.json() if c not in ("Unknown", "Antarctica")]
+        continents = client.get_json("/definitions/continents", timeout=15)
+        return [c for c in continents if c not in ("Unknown", "Antarctica")]
     except requests.RequestException as e:
+        if not fallback:
+            raise
         print(f"Error fetching continents: {e}")
         return ["Africa", "Asia", "Europe", "North America", "South America", "Oceania"]
 
 
+def fetch_sources(year=2024, gas="co2e_100yr", sectors=None, limit=100, offset=0):
+    """Request ranked sources straight from the API, bypassing the cache.
+
+    Takes the same arguments as ``get_sources``, plus ``offset`` to skip
+    that many top-ranked sources.
+
+    Raises:
+        requests.RequestException: If the upstream call fails.
+    """
+    params = {"year": year, "gas": gas, "limit": limit}
+    if offset:
+        params["offset"] = offset
+    if sectors:
+        params["sectors"] = ",".join(sectors)
+    return client.get_json("/sources", params=params, timeout=30)
+
+
+_FINAL_ERRORS = (resilience.CircuitOpen, resilience.DeadlineExceeded)
+
+
+def _fetch_page(year, gas, sectors, offset, size):
+    for attempt in range(1, PAGE_ATTEMPTS + 1):
+        try:
+            return fetch_sources(year, gas, sectors, size, offset)
+        except requests.RequestException as e:
+            # Retrying cannot help once the circuit is open or the budget is spent.
+            if attempt == PAGE_ATTEMPTS or isinstance(e, _FINAL_ERRORS):
+                raise
+            print(f"Retrying sources page {sectors or 'all'}@{offset}: {e}")
+            time.sleep(2 ** (attempt - 1))
+
+
+def _pages(partitions, limit, page_size, done):
+    """Yield ``(partition, offset, size)`` round-robin until all are done."""
+    offset = 0
+    while limit is None or offset < limit:
+        live = [i for i in range(len(partitions)) if i not in done]
+        if not live:
+            return
+        size = page_size if limit is None else min(page_size, limit - offset)
+        for i in live:
+            yield i, offset, size
+        offset += page_size
+
+
+def iter_sources(
+    year=2024,
+    gas="co2e_100yr",
+    sectors=None,
+    limit=None,
+    by_sector=False,
+    page_size=PAGE_SIZE,
+    workers=PAGE_WORKERS,
+):
+    """Stream ranked sources from the API in pages, bypassing the cache.
+
+    Pages are requested concurrently, at most ``workers`` at a time, and
+    yielded in request order, so memory stays bounded by ``workers`` pages
+    however many sources are pulled. Each page is retried on its own before
+    the whole pull fails.
+
+    Args:
+        year: Emissions year.
+        gas: Gas type.
+        sectors: List of sector strings or None for all.
+        limit: Sources to pull (per sector with ``by_sector``), or None to
+            page until the API runs out.
+        by_sector: Page each of ``sectors`` (default ``SECTORS``) separately.
+            Batches are then ranked within their own sector only.
+        page_size: Sources per request.
+        workers: Max concurrent page requests.
+
+    Yields:
+        Non-empty lists of source dicts, at most ``page_size`` long.
+
+    Raises:
+        requests.RequestException: If a page still fails after retries.
+    """
+    if by_sector:
+        partitions = [[sector] for sector in sorted(set(sectors or SECTORS))]
+    else:
+        partitions = [sorted(set(sectors)) if sectors else None]
+    done = set()
+    pages = _pages(partitions, limit, page_size, done)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def submit():
+            for part, offset, size in pages:
+                if part not in done:
+                    # Pages keep the caller's scheduling priority.
+                    run = contextvars.copy_context().run
+                    future = pool.submit(run, _fetch_page, year, gas, partitions[part], offset, size)
+                    pending.append((part, size, future))
+                    return True
+            return False
+
+        try:
+            while len(pending) < workers and submit():
+                pass
+            while pending:
+                part, size, future = pending.popleft()
+                batch = future.result()
+                # A short page ends its partition; pages already in flight
+                # beyond it are dropped.
+                ended = part in done
+                if len(batch) < size:
+                    done.add(part)
+                submit()
+                if batch and not ended:
+                    yield batch
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+
+
+def fetch_emissions(year=2024, gas="co2e_100yr", continent=None, sector=None):
+    """Request aggregated emissions straight from the API, bypassing the cache.
+
+    Takes the same arguments as ``get_emissions``.
+
+    Raises:
+        requests.RequestException: If the upstream call fails.
+    """
+    params = {"year": year, "gas": gas}
+    if continent:
+        params["continent"] = continent
+    if sector:
+        params["sector"] = ",".join(sector)
+    return client.get_json("/sources/emissions", params=params, timeout=30)
+
+
 def get_sources(year=2024, gas="co2e_100yr", sectors=None, limit=100):
     """Fetch ranked emission sources.
 
@@ -49,22 +294,90 @@ def get_sources(year=2024, gas="co2e_100yr", sectors=None, limit=100):
         sectors: List of sector strings or None for all.
         limit: Max results to return.
 
+    Sector filters are answered by merging the cached top sources of each
+    selected sector, so every combination shares the same per-sector
+    entries instead of caching one upstream response per combination.
+
     Returns:
         List of source summary dicts.
     """
-    params = {"year": year, "gas": gas, "limit": limit}
-    if sectors:
-        params["sectors"] = ",".join(sectors)
+    sectors = sorted(set(sectors)) if sectors else None
+    if BACKEND == "snapshot":
+        return snapshot.get_sources(year=year, gas=gas, sectors=sectors, limit=limit)
 
     try:
-        response = requests.get(f"{BASE_URL}/sources", params=params, timeout=30)
-        response.raise_for_status()
-        return response.json()
+        if sectors:
+            k = max(limit, SECTOR_TOP_K)
+            # Each fetch runs in a copy of this context so the callback's
+            # budget and stale flag follow it onto the pool.
+            with ThreadPoolExecutor(max_workers=len(sectors)) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, _sector_ranking, year, gas, s, k)
+                    for s in sectors
+                ]
+                rankings = [f.result() for f in futures]
+            return merge_top_k(rankings, limit)
+        key = make_key("sources", year=year, gas=gas, sectors=None, limit=limit)
+        return _cached(key, lambda: fetch_sources(year, gas, None, limit), "sources")
     except requests.RequestException as e:
+        resilience.mark_failed()
         print(f"Error fetching sources: {e}")
         return []
 
 
+def _sector_ranking(year, gas, sector, k):
+    """Cached top ``k`` sources of one sector."""
+    key = make_key("sources", year=year, gas=gas, sectors=[sector], limit=k)
+    return _cached(key, lambda: fetch_sources(year, gas, [sector], k), "sources")
+
+
+def _cached(key, fetch, kind):
+    """``cache.get_or_fetch`` that falls back to the last good payload.
+
+    A failure marks the current request failed, and a fallback also marks
+    it stale (see ``resilience``), so the page can say it is showing old
+    data and its output is not cached. Callers coalesced onto another
+    request's fetch are marked here too, since only the request that ran
+    the fetch saw the error in ``client.get_json``.
+
+    Raises:
+        requests.RequestException: If the fetch fails and nothing was ever
+            cached under ``key``.
+    """
+    try:
+        return cache.get_or_fetch(key, fetch)
+    except requests.RequestException as e:
+        resilience.mark_failed()
+        value = cache.last_good(key)
+        if value is MISS:
+            raise
+        print(f"Serving last good {kind} after upstream error: {e}")
+        metrics.STALE_FALLBACKS.inc(kind=kind)
+        resilience.mark_stale()
+        return value
+
+
+def get_sources_by_sector(year=2024, gas="co2e_100yr", limit=500):
+    """Fetch the top ``limit`` sources of every sector concurrently.
+
+    The union contains the exact top ``limit`` for any combination of
+    sectors, so callers can filter and rank it locally instead of issuing
+    one request per selection.
+
+    Returns:
+        Dict mapping each sector in ``SECTORS`` to its ranked source list.
+    """
+    with ThreadPoolExecutor(max_workers=len(SECTORS)) as pool:
+        futures = [
+            pool.submit(
+                contextvars.copy_context().run,
+                get_sources, year=year, gas=gas, sectors=[sector], limit=limit,
+            )
+            for sector in SECTORS
+        ]
+        return {sector: f.result() for sector, f in zip(SECTORS, futures)}
+
+
 def get_emissions(year=2024, gas="co2e_100yr", continent=None, sector=None):
     """Fetch aggregated monthly emissions data.
 
@@ -77,18 +390,83 @@ def get_emissions(year=2024, gas="co2e_100yr", continent=None, sector=None):
     Returns:
         Dict with location, totals, sectors, and subsectors data.
     """
-    params = {"year": year, "gas": gas}
-    if continent:
-        params["continent"] = continent
-    if sector:
-        params["sector"] = ",".join(sector)
+    sector = sorted(set(sector)) if sector else None
+    if BACKEND == "snapshot":
+        return snapshot.get_emissions(
+            year=year, gas=gas, continent=continent, sector=sector
+        )
 
+    key = make_key(
+        "emissions", year=year, gas=gas, continent=continent or None, sector=sector
+    )
     try:
-        response = requests.get(
-            f"{BASE_URL}/sources/emissions", params=params, timeout=30
+        return _cached(
+            key, lambda: fetch_emissions(year, gas, continent, sector), "emissions"
         )
-        response.raise_for_status()
-        return response.json()
     except requests.RequestException as e:
+        resilience.mark_failed()
         print(f"Error fetching emissions: {e}")
         return None
+
+
+PREFETCH_WORKERS = int(os.environ.get("CLIMATE_TRACE_PREFETCH_WORKERS", "4"))
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+_prefetch_lock = threading.Lock()
+_prefetches = {}
+
+
+def _prefetch_year(year, gas, continent):
+    with resilience.budget():
+        return get_emissions(year=year, gas=gas, continent=continent), resilience.is_stale()
+
+
+def prefetch_emissions(years, gas="co2e_100yr", continent=None):
+    """Return the years whose emissions are available and fetch the rest.
+
+    Missing years are fetched on a bounded background pool, each cached
+    under its own ``get_emissions`` key, so repeated calls (e.g. from a
+    polling callback) pick up years as they arrive without waiting for the
+    slowest one.
+
+    Years are looked up with ``cache.peek`` so polling does not skew the
+    hit ratio. In-flight fetches are tracked per worker; a year another
+    worker has already stored is found in the shared disk tier and not
+    fetched again.
+
+    Prefetches outlive the callback that started them, so they run
+    without its deadline budget; a year served from the last good payload
+    still marks the caller's request stale when it is picked up.
+
+    Returns:
+        ``(ready, pending)``: a dict mapping each available year to its
+        ``get_emissions`` payload (``None`` if the fetch failed) and a list
+        of years still being fetched.
+    """
+    ready, pending = {}, []
+    for year in years:
+        key = make_key("emissions", year=year, gas=gas, continent=continent or None, sector=None)
+        value = MISS if BACKEND == "snapshot" else cache.peek(key)
+        with _prefetch_lock:
+            future = _prefetches.get(key)
+            if value is MISS and future is None:
+                future = _prefetches[key] = _prefetch_pool.submit(
+                    _prefetch_year, year, gas, continent
+                )
+            # Finished fetches are reported once, then forgotten.
+            done = future is not None and future.done()
+            if done:
+                del _prefetches[key]
+        if value is not MISS:
+            ready[year] = value
+        elif done:
+            ready[year], stale = future.result()
+            if stale:
+                resilience.mark_stale()
+        else:
+            pending.append(year)
+    return ready, pending
+
+
+def cache_stats():
+    """Hit/miss/eviction counters for the response cache in this worker."""
+    return cache.stats()
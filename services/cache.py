@@ -0,0 +1,273 @@
+"""Two-tier response cache: in-process LRU backed by a shared SQLite file."""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from services import resilience
+from services.scheduler import background
+from services.singleflight import SingleFlight
+
+CACHE_SIZE = int(os.environ.get("CLIMATE_TRACE_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.environ.get("CLIMATE_TRACE_CACHE_TTL", str(6 * 3600)))
+CACHE_MAX_STALE = float(
+    os.environ.get("CLIMATE_TRACE_CACHE_MAX_STALE", str(24 * 3600))
+)
+CACHE_PATH = os.environ.get(
+    "CLIMATE_TRACE_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "climatetrace-cache.sqlite3"),
+)
+
+MISS = object()
+
+
+def make_key(endpoint, **params):
+    """Build a canonical cache key for an upstream request.
+
+    List values are de-duplicated and sorted so that sector selections made
+    in a different order share one entry, and empty lists collapse to
+    ``None`` because the API treats both as "all".
+    """
+    normalized = {}
+    for name, value in params.items():
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(set(value)) or None
+        normalized[name] = value
+    return json.dumps([endpoint, normalized], sort_keys=True, separators=(",", ":"))
+
+
+class ResponseCache:
+    """Bounded LRU with TTL in front of an on-disk store shared by workers.
+
+    Entries older than ``ttl`` but younger than ``ttl + max_stale`` are
+    served stale by ``get_or_fetch`` while a background thread refreshes
+    them (stale-while-revalidate). Past that window the caller blocks on
+    the fetch. Values must be JSON-serializable and are returned by
+    reference, so callers should treat them as read-only.
+
+    Args:
+        maxsize: Max entries held in this process.
+        ttl: Seconds an entry stays fresh.
+        path: SQLite file shared by all workers, or ``None``/empty to keep
+            the cache in memory only.
+        max_stale: Seconds past ``ttl`` an entry may still be served while
+            it is refreshed. ``0`` disables stale-while-revalidate.
+    """
+
+    def __init__(
+        self,
+        maxsize=CACHE_SIZE,
+        ttl=CACHE_TTL,
+        path=CACHE_PATH,
+        max_stale=CACHE_MAX_STALE,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.path = path or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._refreshing = set()
+        self._flight = SingleFlight()
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_stored_at ON responses (stored_at)"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _disk_get(self, key):
+        if self.path is None:
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT stored_at, payload FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_set(self, key, stored_at, value):
+        if self.path is None:
+            return
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, stored_at, payload) "
+                "VALUES (?, ?, ?)",
+                (key, stored_at, json.dumps(value, separators=(",", ":"))),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE stored_at < ?",
+                (stored_at - self.ttl - self.max_stale,),
+            )
+        except sqlite3.Error as e:
+            print(f"Cache write failed: {e}")
+
+    def _remember(self, key, stored_at, value):
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _lookup(self, key):
+        """Return ``(stored_at, value, tier)`` for a retained entry or ``None``."""
+        horizon = time.time() - self.ttl - self.max_stale
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= horizon:
+                self._entries.move_to_end(key)
+                return entry[0], entry[1], "memory"
+        entry = self._disk_get(key)
+        if entry is not None and entry[0] >= horizon:
+            self._remember(key, *entry)
+            return entry[0], entry[1], "disk"
+        return None
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        """Return the fresh value for ``key`` or ``MISS``."""
+        entry = self._lookup(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            self._count("hits" if entry[2] == "memory" else "disk_hits")
+            return entry[1]
+        self._count("misses")
+        return MISS
+
+    def peek(self, key):
+        """Like ``get`` but without counting a hit or miss, for polling.
+
+        Reads the shared disk tier too, so values stored by other workers
+        are seen.
+        """
+        entry = self._lookup(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            return entry[1]
+        return MISS
+
+    def last_good(self, key):
+        """Return the newest stored value for ``key`` however old, or ``MISS``.
+
+        For use when the upstream is failing: rows past the stale window
+        survive until the next write prunes them, so an outage keeps its
+        last payloads available.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._disk_get(key)
+        return MISS if entry is None else entry[1]
+
+    def set(self, key, value):
+        """Store ``value`` in both tiers."""
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        self._disk_set(key, stored_at, value)
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached value for ``key``, calling ``fetch`` on a miss.
+
+        A stale entry within ``max_stale`` is returned immediately and
+        ``fetch`` runs on a background thread instead; at most one refresh
+        per key is in flight in this process, and the current request is
+        marked with ``resilience.mark_refreshing()``. Concurrent misses for the
+        same key share one ``fetch``. Exceptions raised by a blocking
+        ``fetch`` propagate to every waiting caller and nothing is stored,
+        so failed upstream calls are never cached.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < self.ttl:
+                self._count("hits" if entry[2] == "memory" else "disk_hits")
+                return entry[1]
+            if self.max_stale > 0 and age < self.ttl + self.max_stale:
+                self._count("stale_hits")
+                resilience.mark_refreshing()
+                self._refresh_async(key, fetch)
+                return entry[1]
+        self._count("misses")
+        return self._flight.do(key, lambda: self._fetch_and_set(key, fetch))
+
+    def _fetch_and_set(self, key, fetch):
+        value = fetch()
+        self.set(key, value)
+        return value
+
+    def _refresh_async(self, key, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+        threading.Thread(
+            target=self._refresh, args=(key, fetch), name="cache-refresh", daemon=True
+        ).start()
+
+    def _refresh(self, key, fetch):
+        try:
+            with background():
+                self._flight.do(key, lambda: self._fetch_and_set(key, fetch))
+        except Exception as e:
+            self._count("refresh_errors")
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        if self.path is not None:
+            try:
+                self._connect().execute("DELETE FROM responses")
+            except sqlite3.Error as e:
+                print(f"Cache clear failed: {e}")
+
+    def stats(self):
+        """Snapshot of hit/miss/eviction/refresh counters and current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["refreshing"] = len(self._refreshing)
+        stats["coalesced"] = self._flight.coalesced
+        stats["in_flight"] = self._flight.in_flight()
+        served = stats["hits"] + stats["disk_hits"] + stats["stale_hits"]
+        lookups = served + stats["misses"]
+        stats["hit_ratio"] = served / lookups if lookups else 0.0
+        return stats
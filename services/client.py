@@ -0,0 +1,234 @@
+"""Pooled HTTP client shared by the Climate Trace service functions."""
+
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services import metrics, resilience
+from services.scheduler import QueueTimeout
+
+POOL_SIZE = int(os.environ.get("CLIMATE_TRACE_POOL_SIZE", "10"))
+MAX_RETRIES = int(os.environ.get("CLIMATE_TRACE_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.environ.get("CLIMATE_TRACE_BACKOFF_FACTOR", "0.5"))
+BACKOFF_JITTER = float(os.environ.get("CLIMATE_TRACE_BACKOFF_JITTER", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Statuses that count against the circuit breaker; other 4xx are our fault.
+FAILURE_STATUSES = frozenset(RETRY_STATUSES)
+# A timeout the budget shortened below this many seconds is blamed on the
+# budget rather than the upstream, so it does not count against the breaker.
+BREAKER_MIN_TIMEOUT = float(os.environ.get("CLIMATE_TRACE_BREAKER_MIN_TIMEOUT", "5"))
+# Timeouts raised on our side before anything was sent upstream.
+_LOCAL_ERRORS = (QueueTimeout, resilience.DeadlineExceeded)
+
+
+class ClimateTraceClient:
+    """Keep-alive client with a bounded connection pool and retries.
+
+    The underlying ``requests.Session`` is created lazily and re-created
+    after a fork, so every gunicorn worker gets its own pool even when the
+    app is preloaded in the master. Within a worker the session is shared
+    by all threads; ``pool_block`` makes threads wait for a free connection
+    instead of opening throwaway ones beyond ``pool_size``.
+
+    Inside a ``resilience.budget()`` requests go through a second session
+    without adapter retries and are retried here instead, so every attempt
+    and backoff is fitted into the time left rather than each attempt
+    getting the full ``timeout``.
+
+    Args:
+        base_url: API root, e.g. ``https://api.climatetrace.org/v7``.
+        pool_size: Max keep-alive connections held per worker.
+        max_retries: Retries for connection errors and 429/5xx responses.
+        backoff_factor: Exponential backoff base in seconds.
+        backoff_jitter: Max random seconds added to each backoff.
+        scheduler: Optional ``RequestScheduler`` every request must clear
+            before it is sent.
+        breaker: Optional ``resilience.CircuitBreaker`` that fails requests
+            fast while the upstream is down.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        pool_size=POOL_SIZE,
+        max_retries=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_jitter=BACKOFF_JITTER,
+        scheduler=None,
+        breaker=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.scheduler = scheduler
+        self.breaker = breaker
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self._lock = threading.Lock()
+        self._session = None
+        self._budget_session = None
+        self._pid = None
+
+    def _build_session(self, retry):
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+            pool_block=True,
+        )
+        session = requests.Session()
+        session.headers.update({"Accept": "application/json"})
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _sessions(self):
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session = self._build_session(self.retry)
+                    self._budget_session = self._build_session(0)
+                    self._pid = pid
+        return self._session, self._budget_session
+
+    @property
+    def session(self):
+        """The worker-local session, created on first use."""
+        return self._sessions()[0]
+
+    def get_json(self, path, params=None, timeout=30):
+        """GET ``path`` relative to the base URL and decode the JSON body.
+
+        Inside a ``resilience.budget()`` the queue wait and the request
+        timeout are capped by the time left in the budget, and a failure
+        marks the request with ``resilience.mark_failed()``.
+
+        Raises:
+            requests.RequestException: On connection failure or a non-2xx
+                response after retries are exhausted, or (as
+                ``scheduler.QueueTimeout``) when the rate limiter could not
+                admit the request before its deadline. Also raised as
+                ``resilience.CircuitOpen`` while the breaker is open and as
+                ``resilience.DeadlineExceeded`` once the budget is spent.
+        """
+        try:
+            return self._get_json(path, params, timeout)
+        except requests.RequestException:
+            resilience.mark_failed()
+            raise
+
+    def _get_json(self, path, params, timeout):
+        remaining = resilience.remaining()
+        if remaining is not None and remaining <= 0:
+            raise resilience.DeadlineExceeded(f"callback budget spent before {path}")
+        if self.breaker is not None:
+            self.breaker.before()
+        try:
+            if self.scheduler is not None:
+                self.scheduler.acquire(deadline=remaining)
+            if remaining is None:
+                response = self._get(self.session, path, params, timeout)
+            else:
+                response = self._get_within_budget(path, params, timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if self.breaker is not None:
+                if isinstance(e, _LOCAL_ERRORS):
+                    self.breaker.release()
+                else:
+                    self.breaker.failure()
+            raise
+        except BaseException:
+            if self.breaker is not None:
+                self.breaker.release()
+            raise
+        if self.breaker is not None:
+            if response.status_code in FAILURE_STATUSES:
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+        response.raise_for_status()
+        return response.json()
+
+    def _get_within_budget(self, path, params, timeout):
+        """Send with retries like the adapter's, stopping when the budget ends.
+
+        A timeout that was shortened below ``BREAKER_MIN_TIMEOUT`` to fit
+        the budget is raised as ``DeadlineExceeded``: the upstream was not
+        shown to be slow, so it does not count against the breaker. Longer
+        waits that time out still do, so a hung upstream opens the circuit.
+        """
+        session = self._sessions()[1]
+        attempt = 0
+        while True:
+            left = resilience.remaining()
+            if left <= 0:
+                raise resilience.DeadlineExceeded(f"callback budget spent during {path}")
+            error = response = None
+            try:
+                response = self._get(session, path, params, min(timeout, left))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                capped = left < timeout and left < BREAKER_MIN_TIMEOUT
+                if capped and isinstance(e, requests.Timeout):
+                    raise resilience.DeadlineExceeded(
+                        f"callback budget spent waiting for {path}"
+                    ) from e
+                error = e
+            if error is None and response.status_code not in RETRY_STATUSES:
+                return response
+            delay = self._backoff(attempt, response)
+            if attempt >= self.max_retries or delay >= resilience.remaining():
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    def _backoff(self, attempt, response):
+        """Seconds to wait before retry ``attempt + 1``, as ``Retry`` computes it."""
+        delay = 0.0
+        if attempt:
+            delay = min(self.backoff_factor * 2**attempt, Retry.DEFAULT_BACKOFF_MAX)
+            delay += random.uniform(0, self.backoff_jitter)
+        retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+        if retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
+
+    def _get(self, session, path, params, timeout):
+        start = time.perf_counter()
+        try:
+            response = session.get(
+                f"{self.base_url}{path}", params=params, timeout=timeout
+            )
+        except requests.RequestException as e:
+            metrics.UPSTREAM_ERRORS.inc(endpoint=path, error=type(e).__name__)
+            raise
+        finally:
+            metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - start, endpoint=path)
+        metrics.UPSTREAM_REQUESTS.inc(endpoint=path, status=response.status_code)
+        return response
+
+    def close(self):
+        """Drop pooled connections; a new session is built on next use."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._budget_session.close()
+            self._session = None
+            self._budget_session = None
+            self._pid = None
@@ -0,0 +1,345 @@
+"""Pre-aggregated year × gas × continent × sector × month emissions cube.
+
+The aggregate page only ever needs monthly totals for one year, gas and
+continent, optionally restricted to a set of sectors. Building those from
+a dense NumPy array is a slice and a sum, so filter changes do not need an
+upstream call once the cube has been built.
+
+Usage:
+    python -m services.cube build [--out PATH] [--years ...] [--gases ...]
+    python -m services.cube check [--samples 20]
+"""
+
+import argparse
+import os
+import random
+import threading
+
+import numpy as np
+import requests
+
+from services import definitions
+from services.aggregation import MonthlyMatrix
+from services.api import SECTORS, fetch_emissions, get_emissions
+from services.scheduler import background
+
+CUBE_PATH = os.environ.get(
+    "CLIMATE_TRACE_CUBE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "emissions_cube.npz"),
+)
+GLOBAL = "all"
+YEARS = range(2015, 2025)
+
+
+class EmissionsCube:
+    """Dense monthly emissions indexed by year, gas, continent and sector.
+
+    Continent index 0 is ``"all"`` and holds the global payload as returned
+    by the API, not a sum over continents.
+
+    Attributes:
+        sectors: Array of shape ``(years, gases, continents, sectors, 12)``.
+        totals: Array of shape ``(years, gases, continents, 12)`` with the
+            API's own totals, used when no sector filter is applied.
+        months: Boolean mask of shape ``(years, gases, continents, 12)``
+            marking months present upstream.
+        present: Boolean mask of shape ``(years, gases, continents, sectors)``
+            marking sectors the API reported; the others are left out of
+            query results, as the API leaves them out.
+        summaries: Array of shape ``(years, gases, continents, sectors, 2)``
+            with the API's own sector summary quantity and percentage, used
+            when no sector filter is applied.
+        loaded: Boolean mask of shape ``(years, gases, continents)``.
+    """
+
+    def __init__(self, years, gases, continents, sectors=SECTORS):
+        self.years = [int(y) for y in years]
+        self.gases = list(gases)
+        self.continents = [GLOBAL] + [c for c in continents if c != GLOBAL]
+        self.sector_names = list(sectors)
+        self._year_idx = {y: i for i, y in enumerate(self.years)}
+        self._gas_idx = {g: i for i, g in enumerate(self.gases)}
+        self._continent_idx = {c: i for i, c in enumerate(self.continents)}
+        self._sector_idx = {s: i for i, s in enumerate(self.sector_names)}
+
+        shape = (len(self.years), len(self.gases), len(self.continents))
+        self.sectors = np.zeros(shape + (len(self.sector_names), 12))
+        self.totals = np.zeros(shape + (12,))
+        self.months = np.zeros(shape + (12,), dtype=bool)
+        self.present = np.zeros(shape + (len(self.sector_names),), dtype=bool)
+        self.summaries = np.full(shape + (len(self.sector_names), 2), np.nan)
+        self.loaded = np.zeros(shape, dtype=bool)
+
+    def _index(self, year, gas, continent):
+        try:
+            return (
+                self._year_idx[int(year)],
+                self._gas_idx[gas],
+                self._continent_idx[continent or GLOBAL],
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def fill(self, year, gas, continent, payload):
+        """Load one unfiltered ``get_emissions`` payload into the cube."""
+        idx = self._index(year, gas, continent)
+        if idx is None or not payload:
+            return
+        for entry in (payload.get("totals") or {}).get("timeseries", []):
+            m = entry["month"] - 1
+            self.totals[idx + (m,)] = entry["emissionsQuantity"]
+            self.months[idx + (m,)] = True
+        section = payload.get("sectors") or {}
+        matrix = MonthlyMatrix.from_entries(section.get("timeseries", []))
+        for key, row in zip(matrix.keys, matrix.values):
+            s = self._sector_idx.get(key)
+            if s is not None:
+                self.sectors[idx + (s,)] = row
+                self.present[idx + (s,)] = True
+        for entry in section.get("summaries") or []:
+            s = self._sector_idx.get(entry.get("sector"))
+            if s is not None:
+                self.summaries[idx + (s,)] = (
+                    entry["emissionsQuantity"],
+                    entry.get("percentage", np.nan),
+                )
+                self.present[idx + (s,)] = True
+        self.loaded[idx] = True
+
+    def monthly(self, year, gas, continent=None, sectors=None):
+        """Monthly totals and per-sector months for one slice.
+
+        Returns:
+            ``(months, totals, sector_names, sector_matrix)`` where ``months``
+            are 1-based month numbers present upstream, ``totals`` their sums
+            and ``sector_matrix`` has one row per entry of ``sector_names``,
+            the requested sectors the API reported; or ``None`` if the slice
+            is not in the cube.
+        """
+        idx = self._index(year, gas, continent)
+        if idx is None or not self.loaded[idx]:
+            return None
+        mask = self.months[idx]
+        present = self.present[idx]
+        if sectors:
+            if any(s not in self._sector_idx for s in sectors):
+                return None
+            wanted = [self._sector_idx[s] for s in sectors]
+            wanted = [i for i in wanted if present[i]]
+            rows = self.sectors[idx][wanted]
+            totals = rows.sum(axis=0)
+        else:
+            wanted = np.flatnonzero(present).tolist()
+            rows = self.sectors[idx][wanted]
+            totals = self.totals[idx]
+        names = [self.sector_names[i] for i in wanted]
+        return np.flatnonzero(mask) + 1, totals[mask], names, rows[:, mask]
+
+    def query(self, year, gas, continent=None, sector=None):
+        """Answer a ``get_emissions`` call from the cube.
+
+        Without a sector filter the API's own sector summaries are returned
+        where the cube has them; otherwise they are summed from the months.
+
+        Returns:
+            Dict with ``totals`` and ``sectors`` shaped like the API response,
+            or ``None`` if the slice is not in the cube.
+        """
+        sliced = self.monthly(year, gas, continent, sector)
+        if sliced is None:
+            return None
+        months, totals, names, rows = sliced
+        month_list = months.tolist()
+        sums = rows.sum(axis=1)
+        grand = float(sums.sum())
+        summaries = [
+            {
+                "sector": name,
+                "emissionsQuantity": q,
+                "percentage": q / grand * 100 if grand else 0.0,
+            }
+            for name, q in zip(names, sums.tolist())
+        ]
+        if not sector:
+            stored = self.summaries[self._index(year, gas, continent)]
+            for summary in summaries:
+                quantity, percentage = stored[self._sector_idx[summary["sector"]]]
+                if not np.isnan(quantity):
+                    summary["emissionsQuantity"] = float(quantity)
+                    if not np.isnan(percentage):
+                        summary["percentage"] = float(percentage)
+        return {
+            "totals": {
+                "timeseries": [
+                    {"month": m, "emissionsQuantity": q}
+                    for m, q in zip(month_list, totals.tolist())
+                ]
+            },
+            "sectors": {
+                "timeseries": [
+                    {"sector": name, "month": m, "emissionsQuantity": q}
+                    for name, row in zip(names, rows.tolist())
+                    for m, q in zip(month_list, row)
+                ],
+                "summaries": summaries,
+            },
+        }
+
+    def save(self, path=CUBE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            years=np.array(self.years),
+            gases=np.array(self.gases),
+            continents=np.array(self.continents),
+            sector_names=np.array(self.sector_names),
+            sectors=self.sectors,
+            totals=self.totals,
+            months=self.months,
+            present=self.present,
+            summaries=self.summaries,
+            loaded=self.loaded,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        with np.load(path) as f:
+            cube = cls(
+                f["years"].tolist(),
+                f["gases"].tolist(),
+                f["continents"].tolist(),
+                f["sector_names"].tolist(),
+            )
+            cube.sectors = f["sectors"]
+            cube.totals = f["totals"]
+            cube.months = f["months"]
+            cube.loaded = f["loaded"]
+            # Cubes saved before these were kept: sectors with any emissions.
+            if "present" in f:
+                cube.present = f["present"]
+                cube.summaries = f["summaries"]
+            else:
+                cube.present = cube.sectors.any(axis=-1)
+        return cube
+
+    @classmethod
+    def build(cls, years, gases, continents, fetch=get_emissions):
+        """Build a cube from unfiltered emissions payloads.
+
+        Args:
+            fetch: Callable with the ``get_emissions`` signature; defaults to
+                the configured backend (API or snapshot).
+        """
+        cube = cls(years, gases, continents)
+        for year in cube.years:
+            for gas in cube.gases:
+                for continent in cube.continents:
+                    name = None if continent == GLOBAL else continent
+                    cube.fill(year, gas, name, fetch(year=year, gas=gas, continent=name))
+        return cube
+
+
+_lock = threading.Lock()
+_current = None
+_current_mtime = None
+
+
+def current():
+    """The cube at ``CUBE_PATH``, reloaded when the file changes.
+
+    Returns ``None`` when no cube has been built.
+    """
+    global _current, _current_mtime
+    try:
+        mtime = os.path.getmtime(CUBE_PATH)
+    except OSError:
+        return None
+    if mtime != _current_mtime:
+        with _lock:
+            if mtime != _current_mtime:
+                _current = EmissionsCube.load(CUBE_PATH)
+                _current_mtime = mtime
+    return _current
+
+
+def query(year, gas, continent=None, sector=None):
+    """``get_emissions`` answered from the cube, or ``None`` if unavailable."""
+    cube = current()
+    return cube.query(year, gas, continent, sector) if cube is not None else None
+
+
+def check(cube, samples, seed=0):
+    """Compare random cube slices with live, uncached ``get_emissions`` output.
+
+    Returns:
+        List of human-readable mismatch descriptions.
+    """
+    rng = random.Random(seed)
+    loaded = np.argwhere(cube.loaded)
+    problems = []
+    for _ in range(min(samples, len(loaded))):
+        y, g, c = loaded[rng.randrange(len(loaded))]
+        year, gas, continent = cube.years[y], cube.gases[g], cube.continents[c]
+        continent = None if continent == GLOBAL else continent
+        k = rng.randint(0, 3)
+        sector = sorted(rng.sample(cube.sector_names, k)) if k else None
+        label = f"{year}/{gas}/{continent or GLOBAL}/{sector or 'all'}"
+        try:
+            live = fetch_emissions(year, gas, continent, sector)
+        except requests.RequestException as e:
+            problems.append(f"{label}: live fetch failed: {e}")
+            continue
+        ours = cube.query(year, gas, continent, sector)
+        live_ts = {e["month"]: e["emissionsQuantity"] for e in live["totals"]["timeseries"]}
+        ours_ts = {e["month"]: e["emissionsQuantity"] for e in ours["totals"]["timeseries"]}
+        if sector:
+            live_ts = {}
+            for e in live["sectors"]["timeseries"]:
+                if e["sector"] in sector:
+                    live_ts[e["month"]] = live_ts.get(e["month"], 0) + e["emissionsQuantity"]
+        months = sorted(set(live_ts) | set(ours_ts))
+        a = np.array([live_ts.get(m, 0.0) for m in months])
+        b = np.array([ours_ts.get(m, 0.0) for m in months])
+        if not np.allclose(a, b, rtol=1e-6):
+            worst = np.max(np.abs(a - b) / np.maximum(np.abs(a), 1))
+            problems.append(f"{label}: monthly totals differ (max rel diff {worst:.2e})")
+        live_sectors = {e["sector"] for e in live["sectors"].get("summaries", [])}
+        ours_sectors = {e["sector"] for e in ours["sectors"]["summaries"]}
+        if not sector and live_sectors != ours_sectors:
+            problems.append(f"{label}: sectors differ ({sorted(live_sectors ^ ours_sectors)})")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify the emissions cube.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="rebuild the cube")
+    build_cmd.add_argument("--out", default=CUBE_PATH)
+    build_cmd.add_argument("--years", type=int, nargs="+", default=list(YEARS))
+    build_cmd.add_argument("--gases", nargs="+")
+    check_cmd = sub.add_parser("check", help="compare the cube with live get_emissions")
+    check_cmd.add_argument("--path", default=CUBE_PATH)
+    check_cmd.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        cube = EmissionsCube.build(
+            args.years, args.gases or definitions.gases(), definitions.continents()
+        )
+        cube.save(args.out)
+        print(f"Built cube with {int(cube.loaded.sum())}/{cube.loaded.size} slices -> {args.out}")
+    else:
+        problems = check(EmissionsCube.load(args.path), args.samples)
+        for problem in problems:
+            print(problem)
+        if problems:
+            raise SystemExit(f"{len(problems)} mismatches")
+        print("Cube matches live get_emissions output")
+
+
+if __name__ == "__main__":
+    # Bulk pulls yield the shared upstream rate limit to interactive traffic.
+    with background():
+        main()
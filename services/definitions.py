@@ -0,0 +1,128 @@
+"""Gas and continent definitions served from a snapshot, refreshed lazily.
+
+Pages read definitions from memory, so importing them never touches the
+network. At startup the newest snapshot on disk is used (falling back to
+the copy bundled with the package); ``refresh_async`` then updates it from
+the API on a background thread once the server is accepting requests.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from services.api import get_continents, get_gases
+from services.scheduler import background
+
+BUNDLED_PATH = os.path.join(os.path.dirname(__file__), "data", "definitions.json")
+SNAPSHOT_PATH = os.environ.get(
+    "CLIMATE_TRACE_DEFINITIONS_PATH",
+    os.path.join(tempfile.gettempdir(), "climatetrace-definitions.json"),
+)
+SNAPSHOT_TTL = float(os.environ.get("CLIMATE_TRACE_DEFINITIONS_TTL", str(24 * 3600)))
+
+_lock = threading.Lock()
+_definitions = None
+_refresh_started = False
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not data.get("gases") or not data.get("continents"):
+        return None
+    return data
+
+
+def _write(path, data):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write definitions snapshot: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _load():
+    global _definitions
+    with _lock:
+        if _definitions is None:
+            _definitions = _read(SNAPSHOT_PATH) or _read(BUNDLED_PATH)
+        return _definitions
+
+
+def gases():
+    """Available gas types from the current snapshot."""
+    return list(_load()["gases"])
+
+
+def continents():
+    """Available continents from the current snapshot."""
+    return list(_load()["continents"])
+
+
+def _snapshot_age():
+    try:
+        return time.time() - os.path.getmtime(SNAPSHOT_PATH)
+    except OSError:
+        return None
+
+
+def refresh():
+    """Fetch definitions from the API and persist them as the new snapshot.
+
+    Returns:
+        True if the snapshot was updated.
+    """
+    global _definitions
+    try:
+        data = {
+            "gases": get_gases(fallback=False),
+            "continents": get_continents(fallback=False),
+        }
+    except requests.RequestException as e:
+        print(f"Error refreshing definitions: {e}")
+        return False
+    _write(SNAPSHOT_PATH, data)
+    with _lock:
+        _definitions = data
+    return True
+
+
+def refresh_async():
+    """Start a one-off background refresh unless the snapshot is recent.
+
+    Safe to call on every request: only the first call in a process does
+    anything, and workers skip the fetch when another worker has already
+    written a snapshot younger than ``SNAPSHOT_TTL``.
+    """
+    global _refresh_started, _definitions
+    with _lock:
+        if _refresh_started:
+            return
+        _refresh_started = True
+
+    age = _snapshot_age()
+    if age is not None and age < SNAPSHOT_TTL:
+        fresh = _read(SNAPSHOT_PATH)
+        if fresh is not None:
+            with _lock:
+                _definitions = fresh
+            return
+
+    threading.Thread(target=_background_refresh, name="definitions-refresh", daemon=True).start()
+
+
+def _background_refresh():
+    with background():
+        refresh()
@@ -0,0 +1,268 @@
+"""Columnar source sets, a viewport grid index and zoom-dependent binning.
+
+For each ``(year, gas)`` the top ``INDEX_SIZE`` sources, plus each sector's
+own top sources, are fetched once and bucketed into a uniform lat/lon grid,
+so the top sources inside any map viewport come from a few array slices
+instead of an upstream call.
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import requests
+
+from services import api, resilience
+from services.cache import make_key
+from services.jobs import data_version
+from services.metrics import BUILD_SECONDS
+
+# Roughly the on-screen size of one bin: MapLibre tiles are 512 px wide.
+BIN_PIXELS = 40
+TILE_PIXELS = 512
+# Show individual markers once this few sources are in view.
+MAX_MARKERS = 1500
+# Initial zoom of the sources map, used until the browser reports a view.
+DEFAULT_ZOOM = 1.3
+# Sources indexed per (year, gas); viewport queries rank within this pool.
+INDEX_SIZE = 20000
+INDEX_CELL_DEGREES = 2.0
+SOURCE_SET_CACHE = 4
+# Seconds of upstream time a cold index build may take, whatever is left of
+# the callback's own budget: the pull and the sector fan-out are paid once
+# per (year, gas) and then shared by every viewport query.
+INDEX_BUDGET = float(os.environ.get("CLIMATE_TRACE_INDEX_BUDGET", "25"))
+
+WORLD = (-90.0, 90.0, -180.0, 180.0)
+
+
+class SourceSet:
+    """NumPy columns for one ranked source list, sorted by emissions.
+
+    Args:
+        sources: List of source dicts as returned by ``get_sources``.
+    """
+
+    def __init__(self, sources):
+        sources = sorted(sources, key=lambda s: s["emissionsQuantity"], reverse=True)
+        n = len(sources)
+        self.lat = np.fromiter((s["centroid"]["latitude"] for s in sources), float, n)
+        self.lon = np.fromiter((s["centroid"]["longitude"] for s in sources), float, n)
+        self.emissions = np.fromiter((s["emissionsQuantity"] for s in sources), float, n)
+        self.sector_keys, self.sector = np.unique(
+            np.array([s["sector"] for s in sources], dtype=str), return_inverse=True
+        )
+        self.sources = sources
+        self.index = GridIndex(self)
+
+    def __len__(self):
+        return len(self.sources)
+
+    def mask(self, sectors=None, bounds=None, rows=None):
+        """Boolean mask of rows in ``sectors`` and inside ``bounds``.
+
+        Args:
+            sectors: Sector keys to keep, or ``None``/empty for all.
+            bounds: ``(south, north, west, east)`` in degrees; ``west > east``
+                means the box crosses the antimeridian.
+            rows: Optional row indices to test instead of the whole set; the
+                mask then lines up with ``rows``.
+        """
+        lat = self.lat if rows is None else self.lat[rows]
+        lon = self.lon if rows is None else self.lon[rows]
+        keep = np.ones(len(lat), dtype=bool)
+        if sectors:
+            wanted = np.flatnonzero(np.isin(self.sector_keys, sectors))
+            keep &= np.isin(self.sector if rows is None else self.sector[rows], wanted)
+        if bounds is not None:
+            south, north, west, east = bounds
+            keep &= (lat >= south) & (lat <= north)
+            if west <= east:
+                keep &= (lon >= west) & (lon <= east)
+            else:
+                keep &= (lon >= west) | (lon <= east)
+        return keep
+
+    def subset(self, rows):
+        """Source dicts for ``rows`` (indices or mask), in ranking order."""
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return [self.sources[i] for i in rows]
+
+
+class GridIndex:
+    """Uniform lat/lon grid over a ``SourceSet`` for viewport queries.
+
+    Row indices are stored cell by cell (CSR layout), each cell in ranking
+    order, so the rows inside a box are one slice per latitude band.
+
+    Args:
+        source_set: The set to index.
+        cell: Grid cell edge length in degrees.
+    """
+
+    def __init__(self, source_set, cell=INDEX_CELL_DEGREES):
+        self.source_set = source_set
+        self.cell = cell
+        self.nlat = int(math.ceil(180.0 / cell))
+        self.nlon = int(math.ceil(360.0 / cell))
+        cells = self._lat_cell(source_set.lat) * self.nlon + self._lon_cell(source_set.lon)
+        self.order = np.argsort(cells, kind="stable")
+        self.starts = np.searchsorted(cells[self.order], np.arange(self.nlat * self.nlon + 1))
+
+    def _lat_cell(self, lat):
+        return np.clip(((np.asarray(lat) + 90.0) // self.cell).astype(int), 0, self.nlat - 1)
+
+    def _lon_cell(self, lon):
+        return np.clip(((np.asarray(lon) + 180.0) // self.cell).astype(int), 0, self.nlon - 1)
+
+    def candidates(self, bounds):
+        """Rows in the grid cells overlapping ``bounds``, a superset of the box."""
+        south, north, west, east = bounds
+        lat0, lat1 = self._lat_cell([south, north])
+        lon0, lon1 = self._lon_cell([west, east])
+        spans = [(lon0, lon1)] if west <= east else [(lon0, self.nlon - 1), (0, lon1)]
+        slices = []
+        for band in range(lat0, lat1 + 1):
+            row = band * self.nlon
+            for first, last in spans:
+                slices.append(self.order[self.starts[row + first] : self.starts[row + last + 1]])
+        return np.concatenate(slices) if slices else np.empty(0, dtype=int)
+
+    @BUILD_SECONDS.time(step="viewport_query")
+    def query(self, bounds, sectors=None, limit=None):
+        """Indices of the top ``limit`` rows inside ``bounds``, in ranking order.
+
+        Args:
+            bounds: ``(south, north, west, east)`` as for ``SourceSet.mask``.
+            sectors: Sector keys to keep, or ``None``/empty for all.
+            limit: Maximum number of rows, or ``None`` for all.
+        """
+        rows = self.candidates(bounds)
+        rows = rows[self.source_set.mask(sectors, bounds, rows)]
+        # Row numbers are ranks, so the smallest ``limit`` are the top sources.
+        if limit is not None and len(rows) > limit:
+            rows = np.partition(rows, limit - 1)[:limit]
+        rows.sort()
+        return rows
+
+
+def cell_size(zoom):
+    """Bin edge length in degrees for a map zoom level."""
+    return 360.0 * BIN_PIXELS / (TILE_PIXELS * 2 ** math.floor(max(zoom, 0)))
+
+
+@BUILD_SECONDS.time(step="bin_sources")
+def bin_sources(source_set, rows, zoom):
+    """Aggregate ``rows`` of ``source_set`` into a square lat/lon grid.
+
+    Returns:
+        Dict of arrays, one entry per non-empty cell: emission-weighted
+        ``lat``/``lon`` centroid, ``count`` and summed ``emissions``.
+    """
+    rows = np.flatnonzero(rows) if rows.dtype == bool else rows
+    size = cell_size(zoom)
+    lat = source_set.lat[rows]
+    lon = source_set.lon[rows]
+    weight = source_set.emissions[rows]
+    ncols = int(math.ceil(360.0 / size)) + 1
+    cells = np.floor((lat + 90.0) / size).astype(np.int64) * ncols + np.floor(
+        (lon + 180.0) / size
+    ).astype(np.int64)
+    _, cell = np.unique(cells, return_inverse=True)
+    count = np.bincount(cell)
+    total = np.bincount(cell, weights=weight)
+    # Fall back to unweighted centroids for cells whose sources report zero.
+    denom = np.where(total > 0, total, count)
+    w = np.where(total[cell] > 0, weight, 1.0)
+    return {
+        "lat": np.bincount(cell, weights=lat * w) / denom,
+        "lon": np.bincount(cell, weights=lon * w) / denom,
+        "count": count,
+        "emissions": total,
+    }
+
+
+def viewport_bounds(viewport):
+    """``(south, north, west, east)`` from a viewport dict, or the world."""
+    if not viewport or not viewport.get("bounds"):
+        return WORLD
+    south, north, west, east = viewport["bounds"]
+    if east - west >= 360:
+        west, east = -180.0, 180.0
+    else:
+        west = (west + 180.0) % 360.0 - 180.0
+        east = (east + 180.0) % 360.0 - 180.0
+    return max(south, -90.0), min(north, 90.0), west, east
+
+
+_lock = threading.Lock()
+_source_sets = OrderedDict()
+
+
+def _source_id(source):
+    centroid = source.get("centroid") or {}
+    return source.get("id") or (
+        source.get("name"), centroid.get("latitude"), centroid.get("longitude")
+    )
+
+
+def _load_top(year, gas):
+    if api.BACKEND == "snapshot":
+        return api.get_sources(year=year, gas=gas, limit=INDEX_SIZE)
+    # Cached like any response, so the disk tier shares one pull between
+    # gunicorn workers and background callback jobs.
+    key = make_key("sources-index", year=year, gas=gas, limit=INDEX_SIZE)
+    try:
+        return api.cache.get_or_fetch(
+            key,
+            lambda: [s for batch in api.iter_sources(year, gas, limit=INDEX_SIZE) for s in batch],
+        )
+    except requests.RequestException as e:
+        resilience.mark_failed()
+        print(f"Error fetching sources: {e}")
+        return []
+
+
+def _load_sources(year, gas):
+    """The overall top ``INDEX_SIZE`` plus each sector's top ``SECTOR_TOP_K``.
+
+    A sector's sources within the overall ranking are a prefix of that
+    sector's own ranking, so adding the per-sector rankings the page
+    already loads keeps every sector's pool a prefix at least
+    ``SECTOR_TOP_K`` deep: sector-filtered viewport queries then return the
+    same sources as the in-browser path, small sectors included.
+    """
+    merged = {_source_id(s): s for s in _load_top(year, gas)}
+    rankings = api.get_sources_by_sector(year=year, gas=gas, limit=api.SECTOR_TOP_K)
+    for sources in rankings.values():
+        for s in sources:
+            merged.setdefault(_source_id(s), s)
+    return list(merged.values())
+
+
+def source_set(year, gas):
+    """Cached, indexed ``SourceSet`` of the sources from ``_load_sources``.
+
+    Sets are keyed by ``data_version()`` too, so they are rebuilt once the
+    data behind them may have changed, and a build that saw upstream
+    errors, stale fallbacks or refreshing entries (see
+    ``resilience.reusable``) is used for this request only.
+    """
+    key = (year, gas, data_version())
+    with _lock:
+        cached = _source_sets.get(key)
+        if cached is not None:
+            _source_sets.move_to_end(key)
+            return cached
+    with resilience.extended(INDEX_BUDGET):
+        built = SourceSet(_load_sources(year, gas))
+    if not len(built) or not resilience.reusable():
+        return built
+    with _lock:
+        _source_sets[key] = built
+        while len(_source_sets) > SOURCE_SET_CACHE:
+            _source_sets.popitem(last=False)
+    return built
@@ -0,0 +1,97 @@
+"""Pull Climate Trace data into the local snapshot store.
+
+Usage:
+    python -m services.ingest [--out DIR] [--years 2023 2024] [--gases co2e_100yr]
+                              [--limit 500] [--skip-sources] [--skip-emissions]
+
+For every year and gas the pages expose this stores the overall top
+``--limit`` sources plus the top ``--limit`` of each sector (so any sector
+combination can be ranked locally), and the unfiltered monthly emissions
+for the world and each continent.
+"""
+
+import argparse
+import time
+
+import requests
+
+from services import definitions
+from services.api import fetch_emissions, iter_sources
+from services.scheduler import background
+from services.snapshot import SNAPSHOT_DIR, SnapshotStore
+
+SOURCE_YEARS = range(2021, 2025)
+EMISSION_YEARS = range(2015, 2025)
+ATTEMPTS = 3
+
+
+def _with_retry(fetch, *args, **kwargs):
+    for attempt in range(1, ATTEMPTS + 1):
+        try:
+            return fetch(*args, **kwargs)
+        except requests.RequestException as e:
+            if attempt == ATTEMPTS:
+                raise
+            print(f"  retrying after error: {e}")
+            time.sleep(2**attempt)
+
+
+def ingest_sources(store, year, gas, limit):
+    # iter_sources pages concurrently and retries each page itself.
+    sources = []
+    for batch in iter_sources(year, gas, limit=limit):
+        sources.extend(batch)
+    for batch in iter_sources(year, gas, limit=limit, by_sector=True):
+        sources.extend(batch)
+    path = store.write_sources(year, gas, sources)
+    print(f"sources {year}/{gas}: {len(sources)} rows -> {path}")
+
+
+def ingest_emissions(store, year, gas, continents):
+    payloads = {}
+    for continent in [None] + continents:
+        payloads[continent] = _with_retry(fetch_emissions, year, gas, continent, None)
+    path = store.write_emissions(year, gas, payloads)
+    print(f"emissions {year}/{gas}: {len(payloads)} locations -> {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local Climate Trace snapshot.")
+    parser.add_argument("--out", default=SNAPSHOT_DIR, help="snapshot directory")
+    parser.add_argument("--years", type=int, nargs="+", help="years to ingest")
+    parser.add_argument("--gases", nargs="+", help="gases to ingest")
+    parser.add_argument("--limit", type=int, default=500, help="sources per ranking")
+    parser.add_argument("--skip-sources", action="store_true")
+    parser.add_argument("--skip-emissions", action="store_true")
+    args = parser.parse_args()
+
+    definitions.refresh()
+    gases = args.gases or definitions.gases()
+    continents = definitions.continents()
+    store = SnapshotStore(args.out)
+
+    failed = []
+    for gas in gases:
+        if not args.skip_sources:
+            for year in args.years or SOURCE_YEARS:
+                try:
+                    ingest_sources(store, year, gas, args.limit)
+                except requests.RequestException as e:
+                    print(f"sources {year}/{gas} failed: {e}")
+                    failed.append(("sources", year, gas))
+        if not args.skip_emissions:
+            for year in args.years or EMISSION_YEARS:
+                try:
+                    ingest_emissions(store, year, gas, continents)
+                except requests.RequestException as e:
+                    print(f"emissions {year}/{gas} failed: {e}")
+                    failed.append(("emissions", year, gas))
+
+    if failed:
+        raise SystemExit(f"{len(failed)} partitions failed: {failed}")
+
+
+if __name__ == "__main__":
+    # Bulk pulls yield the shared upstream rate limit to interactive traffic.
+    with background():
+        main()
@@ -0,0 +1,126 @@
+"""Opt-in Dash background callbacks for heavy views.
+
+With ``CLIMATE_TRACE_BACKGROUND_CALLBACKS=1`` callbacks declared with
+``heavy_callback`` run as Dash background callbacks on a
+``DiskcacheManager``: each call runs in a subprocess, the request thread
+returns at once and the browser polls for the result. Results are stored
+in ``CLIMATE_TRACE_JOB_DIR``, shared by all gunicorn workers, and reused
+for identical inputs until ``data_version()`` changes. A job that raised
+or whose data was not ``resilience.reusable()`` bumps a counter that is
+part of the same cache key, so its result is shown once and never reused.
+A new call of the same callback terminates the job still running for the
+old inputs.
+
+Without it (or without the ``diskcache``, ``multiprocess`` and ``psutil``
+packages) the callbacks run synchronously in the request as before.
+"""
+
+import functools
+import os
+import tempfile
+import time
+
+from dash import callback
+
+from services import api, cube, resilience
+from services.cache import CACHE_TTL
+
+BACKGROUND = os.environ.get("CLIMATE_TRACE_BACKGROUND_CALLBACKS", "") not in ("", "0")
+JOB_DIR = os.environ.get(
+    "CLIMATE_TRACE_JOB_DIR", os.path.join(tempfile.gettempdir(), "climatetrace-jobs")
+)
+# Seconds an unread job result is kept.
+JOB_EXPIRE = float(os.environ.get("CLIMATE_TRACE_JOB_EXPIRE", "3600"))
+# Upstream time budget of one job; jobs do not hold request threads, so
+# they get longer than a synchronous callback.
+JOB_BUDGET = float(os.environ.get("CLIMATE_TRACE_JOB_BUDGET", "60"))
+# Milliseconds between the browser's polls for a job's progress and result.
+JOB_POLL_INTERVAL = int(os.environ.get("CLIMATE_TRACE_JOB_POLL_INTERVAL", "250"))
+# Job cache counter of results built from failing calls.
+_UNHEALTHY_KEY = "climatetrace-unhealthy-results"
+
+
+def data_version():
+    """Token that changes whenever the data behind the views may have.
+
+    Combines the backend, the emissions cube file's mtime and the response
+    cache's TTL period, so reused results never outlive the data they were
+    built from by more than one TTL.
+    """
+    try:
+        cube_mtime = os.path.getmtime(cube.CUBE_PATH)
+    except OSError:
+        cube_mtime = None
+    return f"{api.BACKEND}:{cube_mtime}:{int(time.time() // CACHE_TTL)}"
+
+
+manager = None
+if BACKGROUND:
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+
+        manager = DiskcacheManager(
+            diskcache.Cache(JOB_DIR),
+            cache_by=[data_version, lambda: manager.handle.get(_UNHEALTHY_KEY, 0)],
+            expire=JOB_EXPIRE,
+        )
+    except ImportError as e:
+        print(f"Background callbacks disabled: {e}")
+
+
+def _no_progress(*_):
+    pass
+
+
+def heavy_callback(*args, progress=None, progress_default=None, cancel=None, **kwargs):
+    """``dash.callback`` that runs as a background job when enabled.
+
+    The decorated function takes a ``set_progress`` callable first, then
+    the callback arguments. ``set_progress`` updates the ``progress``
+    outputs while the job runs and does nothing when the callback runs
+    synchronously.
+
+    Args:
+        progress: Outputs updated through ``set_progress``.
+        progress_default: Values of ``progress`` when no job is running.
+        cancel: Inputs that terminate a running job when they change.
+    """
+
+    def decorate(fn):
+        if manager is None:
+
+            @functools.wraps(fn)
+            def run(*values):
+                return fn(_no_progress, *values)
+
+            return callback(*args, **kwargs)(run)
+
+        @functools.wraps(fn)
+        def job(*values):
+            set_progress = _no_progress
+            if progress is not None:
+                set_progress, *values = values
+            healthy = False
+            with resilience.budget(JOB_BUDGET):
+                try:
+                    result = fn(set_progress, *values)
+                    healthy = resilience.reusable()
+                    return result
+                finally:
+                    # Changes every job cache key, so this result is not reused.
+                    if not healthy:
+                        manager.handle.incr(_UNHEALTHY_KEY, default=0)
+
+        return callback(
+            *args,
+            background=True,
+            manager=manager,
+            interval=JOB_POLL_INTERVAL,
+            progress=progress,
+            progress_default=progress_default,
+            cancel=cancel,
+            **kwargs,
+        )(job)
+
+    return decorate
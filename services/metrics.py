@@ -0,0 +1,208 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Metrics live in the worker process that records them; with several gunicorn
+workers each scrape of ``/metrics`` reports the worker that served it.
+Recording is a dict update under a lock, cheap enough to leave on.
+"""
+
+import bisect
+import functools
+import threading
+import time
+
+# Seconds; spans a cached lookup up to a slow upstream call.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Bytes; a small Patch up to a large figure.
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count, optionally split by labels."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = self._header()
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Bucketed observations with running sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def time(self, **labels):
+        """Decorator observing the wrapped function's wall time in seconds."""
+
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, **labels)
+
+            return wrapper
+
+        return decorate
+
+    def render(self):
+        with self._lock:
+            values = {k: (list(v[0]), v[1]) for k, v in self._values.items()}
+        lines = self._header()
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labelnames, key, [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Collected(_Metric):
+    """Values read from a callback at scrape time, e.g. cache counters.
+
+    Args:
+        collect: Callable returning a number, or a dict mapping label value
+            tuples to numbers.
+        kind: ``"gauge"`` or ``"counter"``.
+    """
+
+    def __init__(self, name, help, collect, labelnames=(), kind="gauge"):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def render(self):
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = self._header()
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+def render():
+    """All registered metrics as Prometheus text."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+UPSTREAM_SECONDS = Histogram(
+    "climatetrace_upstream_request_seconds",
+    "Climate Trace API request latency, including retries.",
+    ["endpoint"],
+)
+UPSTREAM_REQUESTS = Counter(
+    "climatetrace_upstream_requests_total",
+    "Climate Trace API requests by final HTTP status.",
+    ["endpoint", "status"],
+)
+UPSTREAM_ERRORS = Counter(
+    "climatetrace_upstream_errors_total",
+    "Climate Trace API requests that raised, by exception type.",
+    ["endpoint", "error"],
+)
+BUILD_SECONDS = Histogram(
+    "climatetrace_build_seconds",
+    "Time spent shaping data and building figures, by step.",
+    ["step"],
+)
+CALLBACK_SECONDS = Histogram(
+    "climatetrace_callback_seconds",
+    "Dash callback request time, including serialization.",
+    ["output"],
+)
+RESPONSE_BYTES = Histogram(
+    "climatetrace_callback_response_bytes",
+    "Serialized Dash callback response size.",
+    ["output"],
+    buckets=SIZE_BUCKETS,
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "climatetrace_upstream_queue_wait_seconds",
+    "Time upstream requests waited for a rate-limit token.",
+    ["priority"],
+)
+QUEUE_TIMEOUTS = Counter(
+    "climatetrace_upstream_queue_timeouts_total",
+    "Upstream requests dropped after waiting past their deadline.",
+    ["priority"],
+)
+BREAKER_TRIPS = Counter(
+    "climatetrace_breaker_trips_total",
+    "Times the upstream circuit breaker opened.",
+)
+BREAKER_REJECTIONS = Counter(
+    "climatetrace_breaker_rejections_total",
+    "Upstream requests refused while the circuit was open.",
+)
+STALE_FALLBACKS = Counter(
+    "climatetrace_stale_fallbacks_total",
+    "Failed fetches answered with the last good cached payload, by kind.",
+    ["kind"],
+)
@@ -0,0 +1,128 @@
+"""Byte-bounded LRU of serialized Dash callback responses.
+
+The default views are requested with the same inputs over and over, and
+each request rebuilds the same figures and JSON even when the data comes
+from cache. Responses of the outputs listed in
+``CLIMATE_TRACE_OUTPUT_CACHE`` (``all`` or comma-separated output ids) are
+kept as the bytes that were sent and served again for an identical
+request without running the callback. Keys cover the output, every input
+and state value, the triggering props and ``jobs.data_version()``, so
+entries stop matching once the data behind them may have changed.
+Responses built from failed calls, last-good fallbacks or response cache
+entries past their TTL (served while a refresh runs) are not stored, so
+the next request rebuilds them from the refreshed data.
+
+The cache lives in each worker process; ``CLIMATE_TRACE_OUTPUT_CACHE_BYTES``
+bounds its size, and ``0`` turns it off.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from services import metrics
+from services.jobs import data_version
+
+OUTPUTS = os.environ.get(
+    "CLIMATE_TRACE_OUTPUT_CACHE",
+    "src-data,src-view,agg-data,agg-total-chart,agg-sector-chart,agg-years-chart",
+)
+MAX_BYTES = int(os.environ.get("CLIMATE_TRACE_OUTPUT_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+
+class OutputCache:
+    """LRU of response bodies evicted by total size.
+
+    Args:
+        max_bytes: Max total size of the stored bodies. A single body
+            larger than a quarter of this is not stored.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def get(self, key):
+        """Return the stored body for ``key`` or ``None``."""
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return body
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            self._stats["stores"] += 1
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss/store/eviction counters, entry count and stored bytes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        return stats
+
+
+cache = OutputCache()
+
+metrics.Collected(
+    "climatetrace_output_cache_events_total",
+    "Rendered callback output cache lookups and stores.",
+    lambda: {(k,): v for k, v in cache.stats().items() if k not in ("entries", "bytes")},
+    ["event"],
+    kind="counter",
+)
+metrics.Collected(
+    "climatetrace_output_cache_bytes",
+    "Bytes of serialized callback responses held in this worker.",
+    lambda: cache.stats()["bytes"],
+)
+
+
+def wanted(output):
+    """Whether responses for the ``output`` string are cached."""
+    if MAX_BYTES <= 0 or not OUTPUTS:
+        return False
+    if OUTPUTS in ("1", "all"):
+        return True
+    return any(name and name in output for name in OUTPUTS.split(","))
+
+
+def cache_key(body):
+    """Key of a decoded ``/_dash-update-component`` request body."""
+    canonical = json.dumps(
+        [
+            body.get("output"),
+            body.get("inputs"),
+            body.get("state"),
+            sorted(body.get("changedPropIds") or []),
+            data_version(),
+        ],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
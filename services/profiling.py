@@ -0,0 +1,177 @@
+"""Opt-in cProfile capture of Dash callback requests.
+
+A callback request is profiled when its output matches
+``CLIMATE_TRACE_PROFILE`` (``all`` or comma-separated output ids, e.g.
+``src-view,agg-total-chart``), or when it carries an ``X-Profile-Token``
+header equal to ``CLIMATE_TRACE_PROFILE_TOKEN``. Each profiled request
+writes to ``CLIMATE_TRACE_PROFILE_DIR``:
+
+- ``<stamp>-<output>-<digest>.prof``: raw stats for ``pstats``/snakeviz
+- ``<stamp>-<output>-<digest>.json``: the callback inputs, time split into
+  upstream fetch, processing and serialization, and the hottest functions
+- ``summary.json``: hottest functions over the last ``SUMMARY_WINDOW`` runs
+
+Only one request is profiled at a time; others run normally.
+"""
+
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import pstats
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+
+PROFILE = os.environ.get("CLIMATE_TRACE_PROFILE", "")
+PROFILE_TOKEN = os.environ.get("CLIMATE_TRACE_PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get(
+    "CLIMATE_TRACE_PROFILE_DIR",
+    os.path.join(tempfile.gettempdir(), "climatetrace-profiles"),
+)
+TOP_FUNCTIONS = 25
+SUMMARY_WINDOW = 50
+
+# Functions whose cumulative time counts as a phase, entered from outside it.
+_FETCH = re.compile(r"services[/\\](api|client|snapshot|cube)\.py$")
+_SERIALIZE = {"to_json_plotly"}
+_CALLBACKS = re.compile(r"pages[/\\]\w+\.py$")
+
+_lock = threading.Lock()
+_summary_lock = threading.Lock()
+_recent = deque(maxlen=SUMMARY_WINDOW)
+
+
+class Capture:
+    """One in-progress profile, owning the single profiler slot."""
+
+    def __init__(self, body):
+        self.body = body
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def finish(self):
+        """Stop profiling and write the profile, sidecar and summary."""
+        self.profiler.disable()
+        elapsed = time.perf_counter() - self.started
+        try:
+            _write(self.profiler, self.body, elapsed)
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+        finally:
+            _lock.release()
+
+
+def _wanted(output, token):
+    if PROFILE_TOKEN and token and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+        return True
+    if not PROFILE:
+        return False
+    if PROFILE in ("1", "all"):
+        return True
+    return any(name and name in output for name in PROFILE.split(","))
+
+
+def start(body, token=None):
+    """Begin profiling a callback request if configured to.
+
+    Args:
+        body: Decoded ``/_dash-update-component`` request JSON.
+        token: Value of the ``X-Profile-Token`` header, if any.
+
+    Returns:
+        A ``Capture`` to ``finish()`` after the response is built, or ``None``.
+    """
+    if not _wanted(body.get("output", ""), token):
+        return None
+    if not _lock.acquire(blocking=False):
+        return None
+    try:
+        return Capture(body)
+    except Exception:
+        _lock.release()
+        raise
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f"{filename}:{line}({name})"
+
+
+def _phase_time(stats, members):
+    """Cumulative time in ``members`` entered from callers outside them."""
+    total = 0.0
+    for func in members:
+        callers = stats[func][4]
+        for caller, (_, _, _, cumtime) in callers.items():
+            if caller not in members:
+                total += cumtime
+    return total
+
+
+def phases(stats, elapsed):
+    """Split a request's time into fetch, processing, serialization and other."""
+    raw = stats.stats
+    fetch = {f for f in raw if _FETCH.search(f[0])}
+    serialize = {f for f in raw if f[2] in _SERIALIZE}
+    callbacks = {f for f in raw if _CALLBACKS.search(f[0])}
+    fetch_s = _phase_time(raw, fetch)
+    serialize_s = _phase_time(raw, serialize)
+    # Callbacks fetch from inside their own bodies.
+    processing_s = max(_phase_time(raw, callbacks) - fetch_s, 0.0)
+    return {
+        "fetch": round(fetch_s, 6),
+        "processing": round(processing_s, 6),
+        "serialization": round(serialize_s, 6),
+        "other": round(max(elapsed - fetch_s - processing_s - serialize_s, 0.0), 6),
+    }
+
+
+def _hot(stats):
+    """Top functions by own time as ``{label: seconds}``."""
+    ranked = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)
+    return {_label(func): round(row[2], 6) for func, row in ranked[:TOP_FUNCTIONS]}
+
+
+def _write(profiler, body, elapsed):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    output = body.get("output", "")
+    inputs = {"inputs": body.get("inputs", []), "state": body.get("state", [])}
+    encoded = json.dumps(inputs, sort_keys=True, default=str).encode()
+    digest = hashlib.sha1(encoded).hexdigest()[:8]
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", output).strip("_")[:60] or "callback"
+    stamp = time.strftime("%Y%m%dT%H%M%S") + f"{time.time() % 1:.3f}"[1:]
+    base = os.path.join(PROFILE_DIR, f"{stamp}-{slug}-{digest}")
+
+    profiler.dump_stats(f"{base}.prof")
+    stats = pstats.Stats(profiler)
+    hot = _hot(stats)
+    record = {
+        "output": output,
+        "elapsed": round(elapsed, 6),
+        "phases": phases(stats, elapsed),
+        "hot": hot,
+        **inputs,
+    }
+    with open(f"{base}.json", "w") as f:
+        json.dump(record, f, indent=2, default=str)
+
+    with _summary_lock:
+        _recent.append(hot)
+        summary = {}
+        for run in _recent:
+            for label, seconds in run.items():
+                summary[label] = summary.get(label, 0.0) + seconds
+        top = sorted(summary.items(), key=lambda kv: kv[1], reverse=True)[:TOP_FUNCTIONS]
+        tmp_path = os.path.join(PROFILE_DIR, "summary.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"runs": len(_recent), "hot": dict(top)}, f, indent=2)
+        os.replace(tmp_path, os.path.join(PROFILE_DIR, "summary.json"))
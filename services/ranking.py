@@ -0,0 +1,26 @@
+"""Top-K merging of per-sector source rankings."""
+
+import heapq
+from itertools import islice
+
+
+def _emissions(source):
+    return source.get("emissionsQuantity") or 0
+
+
+def merge_top_k(rankings, k):
+    """Top ``k`` sources across several rankings, highest emissions first.
+
+    Each source belongs to exactly one sector, so the top ``k`` of any
+    sector combination is contained in the union of each sector's own top
+    ``k``. A k-way heap merge reads only as far into each list as needed.
+
+    Args:
+        rankings: Iterables of source dicts, each sorted by
+            ``emissionsQuantity`` descending as returned by the API.
+        k: Number of sources to return.
+
+    Returns:
+        List of at most ``k`` source dicts.
+    """
+    return list(islice(heapq.merge(*rankings, key=_emissions, reverse=True), k))
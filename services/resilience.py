@@ -0,0 +1,210 @@
+"""Circuit breaker and per-request deadline budgets for upstream calls.
+
+``CircuitBreaker`` stops sending requests to Climate Trace after repeated
+failures and lets a single probe through once ``reset_timeout`` has
+passed. ``budget()`` gives each Dash callback request an end-to-end
+deadline that every upstream call in it (including pages fetched on
+worker threads that copy the context) must fit into, and records whether
+any data it served was a stale fallback so the pages can say so, or whether
+any upstream call failed.
+"""
+
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+import requests
+
+from services import metrics
+
+# Seconds a Dash callback request may spend on upstream calls in total;
+# kept under gunicorn's default 30 s worker timeout.
+CALLBACK_BUDGET = float(os.environ.get("CLIMATE_TRACE_CALLBACK_BUDGET", "20"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """The upstream is considered down; the request was not sent."""
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """The callback's time budget ran out before the request could be sent."""
+
+
+class CircuitBreaker:
+    """Fail fast after ``failure_threshold`` consecutive upstream failures.
+
+    While open, requests raise ``CircuitOpen`` immediately. After
+    ``reset_timeout`` seconds one probe request is let through (half-open):
+    success closes the circuit, failure opens it again.
+
+    Args:
+        failure_threshold: Consecutive failures that open the circuit.
+        reset_timeout: Seconds to stay open before probing.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def before(self):
+        """Admit a request or raise ``CircuitOpen``."""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        metrics.BREAKER_REJECTIONS.inc()
+        raise CircuitOpen("Climate Trace circuit open; not sending request")
+
+    def success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def release(self):
+        """Give back a half-open probe slot whose request was never sent."""
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    metrics.BREAKER_TRIPS.inc()
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def state_value(self):
+        """0 closed, 1 half-open, 2 open, for metrics."""
+        return _STATE_VALUES[self.state]
+
+
+class _RequestState:
+    __slots__ = ("deadline", "stale", "failed", "refreshing")
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.stale = False
+        self.failed = False
+        self.refreshing = False
+
+
+_request = contextvars.ContextVar("climatetrace_request", default=None)
+
+
+@contextlib.contextmanager
+def budget(seconds=None):
+    """Give the enclosed upstream calls ``seconds`` in total.
+
+    With ``None`` there is no deadline; stale fallbacks are still tracked.
+    """
+    deadline = None if seconds is None else time.monotonic() + seconds
+    token = _request.set(_RequestState(deadline))
+    try:
+        yield
+    finally:
+        _request.reset(token)
+
+
+@contextlib.contextmanager
+def extended(seconds):
+    """Give the enclosed calls at least ``seconds``, past the budget's deadline.
+
+    For one-off work such as building an index that later requests reuse.
+    Stale and failure flags still land on the current request. Does
+    nothing outside a budget.
+    """
+    state = _request.get()
+    if state is None or state.deadline is None:
+        yield
+        return
+    deadline = state.deadline
+    state.deadline = max(deadline, time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        state.deadline = deadline
+
+
+def start_budget(seconds):
+    """Start a budget without a ``with`` block; pass the token to ``end_budget``."""
+    return _request.set(_RequestState(time.monotonic() + seconds))
+
+
+def end_budget(token):
+    _request.reset(token)
+
+
+def remaining():
+    """Seconds left in the current budget, or ``None`` outside one."""
+    state = _request.get()
+    if state is None or state.deadline is None:
+        return None
+    return state.deadline - time.monotonic()
+
+
+def mark_stale():
+    """Record that the current request served a last-good fallback."""
+    state = _request.get()
+    if state is not None:
+        state.stale = True
+
+
+def is_stale():
+    """Whether the current request has served any last-good fallback."""
+    state = _request.get()
+    return state is not None and state.stale
+
+
+def mark_failed():
+    """Record that an upstream call in the current request raised."""
+    state = _request.get()
+    if state is not None:
+        state.failed = True
+
+
+def degraded():
+    """Whether the current request saw upstream errors or served stale data."""
+    state = _request.get()
+    return state is not None and (state.stale or state.failed)
+
+
+def mark_refreshing():
+    """Record that the current request served a cached entry past its TTL."""
+    state = _request.get()
+    if state is not None:
+        state.refreshing = True
+
+
+def reusable():
+    """Whether output built in the current request may be cached.
+
+    False after any failure or stale fallback, and after serving an entry
+    that is being refreshed, since a newer payload is about to replace it.
+    """
+    state = _request.get()
+    return state is None or not (state.stale or state.failed or state.refreshing)
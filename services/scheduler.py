@@ -0,0 +1,202 @@
+"""Upstream rate limiting with priority queueing for Climate Trace calls.
+
+Every API request takes a token from a ``TokenBucket`` before it is sent.
+The bucket's state lives in a small file locked with ``fcntl``, so all
+gunicorn workers on a host share one budget. Requests that have to wait
+queue in a ``RequestScheduler``: within a worker, interactive (callback)
+fetches go ahead of background work such as stale-cache refreshes and
+ingestion, and a request that cannot get a token before its deadline fails
+with ``QueueTimeout``. The queue itself is per worker; across workers the
+bucket keeps ``reserve`` tokens that only interactive requests may take, so
+background work in one worker cannot drain the budget another worker's
+callbacks need.
+"""
+
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import struct
+import threading
+import time
+
+import requests
+
+from services import metrics
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX development machines
+    fcntl = None
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_STATE = struct.Struct("dd")
+_priority = contextvars.ContextVar("climatetrace_priority", default=INTERACTIVE)
+
+
+class QueueTimeout(requests.exceptions.Timeout):
+    """No rate-limit token became available before the request's deadline."""
+
+
+@contextlib.contextmanager
+def background():
+    """Run the enclosed upstream calls at background priority."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` per second up to ``burst`` tokens.
+
+    Args:
+        rate: Tokens added per second.
+        burst: Bucket capacity.
+        path: State file shared by processes, or ``None`` to keep the
+            bucket in this process only.
+        reserve: Tokens left for interactive requests; background takes
+            wait while no more than this many are available. Capped at
+            ``burst - 1``.
+    """
+
+    def __init__(self, rate, burst, path=None, reserve=0):
+        self.rate = rate
+        self.burst = burst
+        self.reserve = max(min(reserve, burst - 1), 0)
+        self.path = path if fcntl is not None else None
+        self._lock = threading.Lock()
+        self._state = None
+        self._fd = None
+        self._pid = None
+
+    def _file(self):
+        pid = os.getpid()
+        if self._fd is None or self._pid != pid:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = pid
+        return self._fd
+
+    def _take(self, state, floor):
+        now = time.time()
+        if state is None:
+            tokens = float(self.burst)
+        else:
+            tokens = min(self.burst, state[0] + max(now - state[1], 0.0) * self.rate)
+        if tokens >= floor + 1:
+            return (tokens - 1, now), 0.0
+        return (tokens, now), (floor + 1 - tokens) / self.rate
+
+    def take(self, priority=INTERACTIVE):
+        """Take one token if available.
+
+        Args:
+            priority: ``BACKGROUND`` takes only while more than ``reserve``
+                tokens are left.
+
+        Returns:
+            ``0.0`` if a token was taken, otherwise the seconds until one
+            will be available.
+        """
+        floor = self.reserve if priority == BACKGROUND else 0
+        with self._lock:
+            if self.path is None:
+                self._state, wait = self._take(self._state, floor)
+                return wait
+            fd = self._file()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(fd, _STATE.size, 0)
+                state, wait = self._take(
+                    _STATE.unpack(raw) if len(raw) == _STATE.size else None, floor
+                )
+                os.pwrite(fd, _STATE.pack(*state), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            return wait
+
+
+class RequestScheduler:
+    """Grant bucket tokens to waiting requests in priority order.
+
+    Args:
+        bucket: ``TokenBucket`` to draw from, or ``None`` to disable limiting.
+        deadlines: Max seconds a request of each priority may queue.
+    """
+
+    def __init__(self, bucket, deadlines=None):
+        self.bucket = bucket
+        self.deadlines = deadlines or {INTERACTIVE: 10.0, BACKGROUND: 120.0}
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+
+    def acquire(self, priority=None, deadline=None):
+        """Block until this request may go upstream.
+
+        Args:
+            priority: ``INTERACTIVE`` or ``BACKGROUND``; defaults to the
+                priority set by ``background()`` for the calling context.
+            deadline: Max seconds to queue, never more than the priority's
+                own deadline.
+
+        Returns:
+            Seconds spent waiting.
+
+        Raises:
+            QueueTimeout: If no token was granted within the deadline.
+        """
+        if self.bucket is None:
+            return 0.0
+        priority = current_priority() if priority is None else priority
+        label = PRIORITY_NAMES[priority]
+        timeout = self.deadlines[priority]
+        if deadline is not None:
+            timeout = min(timeout, deadline)
+        start = time.monotonic()
+        me = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._waiting, me)
+            try:
+                while True:
+                    wait = None
+                    if self._waiting[0] == me:
+                        wait = self.bucket.take(priority)
+                        if wait == 0.0:
+                            heapq.heappop(self._waiting)
+                            self._cond.notify_all()
+                            waited = time.monotonic() - start
+                            metrics.QUEUE_WAIT_SECONDS.observe(waited, priority=label)
+                            return waited
+                    remaining = start + timeout - time.monotonic()
+                    if remaining <= 0:
+                        metrics.QUEUE_TIMEOUTS.inc(priority=label)
+                        raise QueueTimeout(
+                            f"no upstream rate-limit token within {timeout:.1f}s ({label})"
+                        )
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            except BaseException:
+                if me in self._waiting:
+                    self._waiting.remove(me)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                raise
+
+    def depth(self):
+        """Queued requests per priority name."""
+        with self._cond:
+            counts = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._waiting:
+                counts[PRIORITY_NAMES[priority]] += 1
+            return counts
@@ -0,0 +1,251 @@
+"""Local columnar snapshot of Climate Trace sources and emissions.
+
+Data is stored as Parquet files partitioned by year and gas::
+
+    <root>/sources/year=2024/gas=co2e_100yr/part-0.parquet
+    <root>/emissions/year=2024/gas=co2e_100yr/part-0.parquet
+
+``python -m services.ingest`` writes the store; ``get_sources`` and
+``get_emissions`` here answer queries from it with the same signatures as
+their counterparts in ``services.api``. Point ``CLIMATE_TRACE_SNAPSHOT_DIR``
+at a fixture directory to run the app without network access.
+"""
+
+import os
+import threading
+
+import pandas as pd
+
+SNAPSHOT_DIR = os.environ.get(
+    "CLIMATE_TRACE_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "snapshot"),
+)
+
+_SOURCE_NESTED = ("centroid",)
+_EMISSION_SECTIONS = ("totals", "sectors", "subsectors")
+_EMISSION_COLUMNS = [
+    "continent",
+    "section",
+    "kind",
+    "sector",
+    "subsector",
+    "month",
+    "emissionsQuantity",
+    "percentage",
+]
+
+
+class SnapshotStore:
+    """Reads and writes one snapshot directory.
+
+    Partitions are loaded lazily and kept in memory until the file on disk
+    changes.
+
+    Args:
+        root: Snapshot directory.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._frames = {}
+
+    def _path(self, dataset, year, gas):
+        return os.path.join(
+            self.root, dataset, f"year={int(year)}", f"gas={gas}", "part-0.parquet"
+        )
+
+    def _write(self, dataset, year, gas, df):
+        path = self._path(dataset, year, gas)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def _read(self, dataset, year, gas):
+        path = self._path(dataset, year, gas)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._frames.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        df = pd.read_parquet(path)
+        with self._lock:
+            self._frames[path] = (mtime, df)
+        return df
+
+    def partitions(self, dataset):
+        """List ``(year, gas)`` pairs present for ``dataset``."""
+        base = os.path.join(self.root, dataset)
+        found = []
+        for year_dir in sorted(os.listdir(base)) if os.path.isdir(base) else []:
+            for gas_dir in sorted(os.listdir(os.path.join(base, year_dir))):
+                found.append((int(year_dir.split("=", 1)[1]), gas_dir.split("=", 1)[1]))
+        return found
+
+    # --- sources ---
+
+    def write_sources(self, year, gas, sources):
+        """Store a list of source dicts for ``(year, gas)``.
+
+        Sources are de-duplicated by ``id`` (or name and location when no id
+        is present). Scalar fields are kept as columns and ``centroid`` is
+        flattened into ``latitude``/``longitude``.
+        """
+        rows = {}
+        for s in sources:
+            row = {k: v for k, v in s.items() if k not in _SOURCE_NESTED}
+            centroid = s.get("centroid") or {}
+            row["latitude"] = centroid.get("latitude")
+            row["longitude"] = centroid.get("longitude")
+            row = {k: v for k, v in row.items() if not isinstance(v, (dict, list))}
+            key = row.get("id") or (row.get("name"), row["latitude"], row["longitude"])
+            rows[key] = row
+        df = pd.DataFrame(list(rows.values()))
+        if not df.empty:
+            df = df.sort_values("emissionsQuantity", ascending=False, ignore_index=True)
+        return self._write("sources", year, gas, df)
+
+    def get_sources(self, year=2024, gas="co2e_100yr", sectors=None, limit=100):
+        """Ranked sources from the snapshot; see ``services.api.get_sources``."""
+        df = self._read("sources", year, gas)
+        if df is None:
+            print(f"No snapshot of sources for {year}/{gas}")
+            return []
+        if sectors:
+            df = df[df["sector"].isin(sectors)]
+        df = df.head(limit)
+
+        sources = []
+        for row in df.to_dict("records"):
+            lat = row.pop("latitude")
+            lon = row.pop("longitude")
+            source = {k: v for k, v in row.items() if not _is_missing(v)}
+            source["centroid"] = {"latitude": lat, "longitude": lon}
+            sources.append(source)
+        return sources
+
+    # --- emissions ---
+
+    def write_emissions(self, year, gas, payloads):
+        """Store unfiltered emissions payloads for ``(year, gas)``.
+
+        Args:
+            payloads: Dict mapping continent name (``None`` for global) to the
+                ``get_emissions`` response for that continent with no sector
+                filter.
+        """
+        rows = []
+        for continent, payload in payloads.items():
+            for section in _EMISSION_SECTIONS:
+                block = (payload or {}).get(section) or {}
+                for kind, entries in (
+                    ("timeseries", block.get("timeseries") or []),
+                    ("summary", block.get("summaries") or []),
+                ):
+                    for e in entries:
+                        rows.append(
+                            {
+                                "continent": continent or "",
+                                "section": section,
+                                "kind": kind,
+                                "sector": e.get("sector"),
+                                "subsector": e.get("subsector"),
+                                "month": e.get("month", 0),
+                                "emissionsQuantity": e.get("emissionsQuantity"),
+                                "percentage": e.get("percentage"),
+                            }
+                        )
+        df = pd.DataFrame(rows, columns=_EMISSION_COLUMNS)
+        return self._write("emissions", year, gas, df)
+
+    def get_emissions(self, year=2024, gas="co2e_100yr", continent=None, sector=None):
+        """Aggregated emissions from the snapshot; see ``services.api.get_emissions``.
+
+        Sector filters are applied locally to the stored unfiltered payload:
+        totals are re-summed from the selected sectors' timeseries and sector
+        percentages are relative to the selection.
+        """
+        df = self._read("emissions", year, gas)
+        if df is None:
+            print(f"No snapshot of emissions for {year}/{gas}")
+            return None
+        df = df[df["continent"] == (continent or "")]
+        if df.empty:
+            print(f"No snapshot of emissions for {year}/{gas}/{continent or 'global'}")
+            return None
+
+        if sector:
+            selected = df["sector"].isin(sector)
+            df = df[(df["section"] == "totals") | selected]
+            sector_ts = df[(df["section"] == "sectors") & (df["kind"] == "timeseries")]
+            totals_ts = (
+                sector_ts.groupby("month", as_index=False)["emissionsQuantity"]
+                .sum()
+                .assign(section="totals", kind="timeseries")
+            )
+            sector_sum = df[(df["section"] == "sectors") & (df["kind"] == "summary")]
+            total = sector_sum["emissionsQuantity"].sum()
+            sector_sum = sector_sum.assign(
+                percentage=sector_sum["emissionsQuantity"] / total * 100 if total else 0.0
+            )
+            totals_sum = pd.DataFrame(
+                [{"section": "totals", "kind": "summary", "emissionsQuantity": total}]
+            )
+            rest = df[(df["section"] != "totals") & ~(
+                (df["section"] == "sectors") & (df["kind"] == "summary")
+            )]
+            df = pd.concat([totals_ts, totals_sum, sector_sum, rest], ignore_index=True)
+
+        data = {}
+        for section in _EMISSION_SECTIONS:
+            part = df[df["section"] == section]
+            data[section] = {
+                "timeseries": _entries(part[part["kind"] == "timeseries"]),
+                "summaries": _entries(part[part["kind"] == "summary"]),
+            }
+        return data
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _entries(df):
+    """Turn emissions rows back into API-shaped entry dicts."""
+    keys = ("sector", "subsector", "month", "emissionsQuantity", "percentage")
+    entries = []
+    for row in df.sort_values(["sector", "subsector", "month"]).to_dict("records"):
+        entry = {k: row.get(k) for k in keys if not _is_missing(row.get(k))}
+        if row["kind"] == "summary":
+            entry.pop("month", None)
+        else:
+            entry["month"] = int(entry["month"])
+            entry.pop("percentage", None)
+        entries.append(entry)
+    return entries
+
+
+_store = None
+
+
+def store():
+    """The process-wide store rooted at ``SNAPSHOT_DIR``."""
+    global _store
+    if _store is None:
+        _store = SnapshotStore()
+    return _store
+
+
+def get_sources(year=2024, gas="co2e_100yr", sectors=None, limit=100):
+    """Ranked sources from the default snapshot."""
+    return store().get_sources(year=year, gas=gas, sectors=sectors, limit=limit)
+
+
+def get_emissions(year=2024, gas="co2e_100yr", continent=None, sector=None):
+    """Aggregated emissions from the default snapshot."""
+    return store().get_emissions(year=year, gas=gas, continent=continent, sector=sector)
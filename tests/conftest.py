@@ -0,0 +1,15 @@
+"""Run the services against the fixture snapshot, without network access."""
+
+import os
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+os.environ.update(
+    {
+        "CLIMATE_TRACE_BACKEND": "snapshot",
+        "CLIMATE_TRACE_SNAPSHOT_DIR": os.path.join(FIXTURES, "snapshot"),
+        "CLIMATE_TRACE_BASE_URL": "http://127.0.0.1:9/v7",
+        "CLIMATE_TRACE_CACHE_PATH": "",
+        "CLIMATE_TRACE_RATE_LIMIT": "0",
+    }
+)
@@ -0,0 +1,38 @@
+import pytest
+
+from services.aggregation import MonthlyMatrix, ranked_summaries
+
+TIMESERIES = [
+    {"sector": "power", "month": 1, "emissionsQuantity": 100.0},
+    {"sector": "power", "month": 2, "emissionsQuantity": 110.0},
+    {"sector": "waste", "month": 1, "emissionsQuantity": 40.0},
+    {"sector": "waste", "month": 2, "emissionsQuantity": 30.0},
+    {"sector": "buildings", "month": 1, "emissionsQuantity": 0.0},
+]
+
+
+def test_matrix_rows_and_totals():
+    matrix = MonthlyMatrix.from_entries(TIMESERIES)
+    assert matrix.months().tolist() == [1, 2]
+    assert matrix.row("power").tolist() == [100.0, 110.0]
+    assert matrix.totals().tolist() == [140.0, 140.0]
+    assert matrix.select(["waste", "missing"]).keys == ["waste"]
+
+
+def test_ranked_summaries_keep_api_numbers():
+    # The API's annual figures need not equal the sum of the monthly series.
+    api = [
+        {"sector": "waste", "emissionsQuantity": 75.0, "percentage": 25.0},
+        {"sector": "power", "emissionsQuantity": 225.0, "percentage": 75.0},
+    ]
+    keys, sums, percentages = ranked_summaries(api, MonthlyMatrix.from_entries(TIMESERIES))
+    assert keys == ["power", "waste"]
+    assert sums.tolist() == [225.0, 75.0]
+    assert percentages.tolist() == [75.0, 25.0]
+
+
+def test_ranked_summaries_from_timeseries_skip_empty_sectors():
+    keys, sums, percentages = ranked_summaries(None, MonthlyMatrix.from_entries(TIMESERIES))
+    assert keys == ["power", "waste"]
+    assert sums.tolist() == [210.0, 70.0]
+    assert percentages.tolist() == pytest.approx([75.0, 25.0])
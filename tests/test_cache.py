@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from services import resilience
+from services.cache import MISS, ResponseCache, make_key
+from services.singleflight import SingleFlight
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def _concurrent(flight, fn, callers=4):
+    """Call ``flight.do`` from ``callers`` threads while the leader is blocked."""
+    release = threading.Event()
+    outcomes = [None] * callers
+
+    def blocked():
+        release.wait(5)
+        return fn()
+
+    def call(i):
+        try:
+            outcomes[i] = flight.do("key", blocked)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for t in threads:
+        t.start()
+    _wait_for(lambda: flight.coalesced == callers - 1)
+    release.set()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    outcomes = _concurrent(flight, lambda: calls.append(1) or {"value": 1})
+    assert len(calls) == 1
+    assert all(o is outcomes[0] for o in outcomes)
+    assert flight.in_flight() == 0
+
+
+def test_singleflight_raises_leader_error_in_every_caller():
+    flight = SingleFlight()
+    error = ValueError("upstream down")
+
+    def fail():
+        raise error
+
+    assert all(o is error for o in _concurrent(flight, fail))
+    # Failures are not remembered: the next call runs again.
+    assert flight.do("key", lambda: 2) == 2
+
+
+def test_make_key_normalizes_list_params():
+    assert make_key("sources", sectors=["waste", "power"]) == make_key(
+        "sources", sectors=["power", "waste", "power"]
+    )
+    assert make_key("sources", sectors=[]) == make_key("sources", sectors=None)
+
+
+def test_failed_fetch_is_not_cached():
+    cache = ResponseCache(path=None)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("k", fail)
+    assert cache.get_or_fetch("k", lambda: 3) == 3
+
+
+def test_stale_entry_is_served_while_refreshing():
+    cache = ResponseCache(ttl=0.05, max_stale=60, path=None)
+    cache.set("k", "old")
+    time.sleep(0.06)
+    fetched = threading.Event()
+
+    def fetch():
+        fetched.set()
+        return "new"
+
+    with resilience.budget():
+        assert cache.get_or_fetch("k", fetch) == "old"
+        assert not resilience.reusable()
+    assert fetched.wait(5)
+    _wait_for(lambda: cache.peek("k") == "new")
+    stats = cache.stats()
+    assert stats["stale_hits"] == 1
+    assert stats["refreshes"] == 1
+    assert stats["refresh_errors"] == 0
+
+
+def test_entry_past_stale_window_blocks_on_fetch():
+    cache = ResponseCache(ttl=0.01, max_stale=0.01, path=None)
+    cache.set("k", "old")
+    time.sleep(0.03)
+    assert cache.get_or_fetch("k", lambda: "new") == "new"
+    assert cache.stats()["stale_hits"] == 0
+    assert cache.last_good("k") == "new"
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = ResponseCache(path=path)
+    reader = ResponseCache(path=path)
+    writer.set("k", {"rows": [1, 2]})
+
+    assert reader.peek("k") == {"rows": [1, 2]}
+    assert reader.stats()["misses"] == 0
+    assert reader.get("k") == {"rows": [1, 2]}
+    # peek promoted the row into memory, so this was a memory hit.
+    assert reader.stats()["hits"] == 1
+    assert ResponseCache(path=path).get("k") == {"rows": [1, 2]}
+    assert reader.get("missing") is MISS
+
+
+def test_clear_drops_both_tiers(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path=path)
+    cache.set("k", 1)
+    cache.clear()
+    assert ResponseCache(path=path).get("k") is MISS
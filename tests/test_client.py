@@ -0,0 +1,125 @@
+import os
+
+import pytest
+import requests
+
+from services import client as client_module, resilience
+from services.client import ClimateTraceClient
+from services.scheduler import QueueTimeout
+
+
+def _response(status, body=b"{}", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    return response
+
+
+class StubSession:
+    """Returns or raises the scripted outcomes in order and records timeouts."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+
+    def get(self, url, params=None, timeout=None):
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    calls = []
+    monkeypatch.setattr(client_module.time, "sleep", calls.append)
+    return calls
+
+
+def _client(session, breaker=None, scheduler=None, max_retries=2):
+    client = ClimateTraceClient(
+        "http://stub",
+        max_retries=max_retries,
+        backoff_factor=0.5,
+        backoff_jitter=0,
+        breaker=breaker or resilience.CircuitBreaker(failure_threshold=5),
+        scheduler=scheduler,
+    )
+    # Both sessions are built lazily per process; install the stub for both.
+    client._session = client._budget_session = session
+    client._pid = os.getpid()
+    return client
+
+
+def test_timeout_capped_by_budget_does_not_count_against_breaker():
+    session = StubSession(requests.exceptions.ReadTimeout())
+    client = _client(session)
+    with resilience.budget(0.5), pytest.raises(resilience.DeadlineExceeded):
+        client.get_json("/sources", timeout=30)
+    assert session.timeouts[0] <= 0.5
+    assert client.breaker._failures == 0
+
+
+def test_uncapped_timeout_counts_against_breaker():
+    session = StubSession(requests.exceptions.ReadTimeout())
+    client = _client(session, max_retries=0)
+    with resilience.budget(60):
+        with pytest.raises(requests.exceptions.ReadTimeout) as raised:
+            client.get_json("/sources", timeout=1)
+        assert resilience.degraded()
+    assert not isinstance(raised.value, resilience.DeadlineExceeded)
+    assert session.timeouts == [1]
+    assert client.breaker._failures == 1
+
+
+def test_local_errors_release_the_half_open_probe():
+    class FullScheduler:
+        def acquire(self, deadline=None):
+            raise QueueTimeout("no token")
+
+    breaker = resilience.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.failure()
+    client = _client(StubSession(), breaker=breaker, scheduler=FullScheduler())
+    with pytest.raises(QueueTimeout):
+        client.get_json("/sources")
+    assert breaker.state == resilience.HALF_OPEN
+    # The probe slot was given back, so the next request may probe.
+    breaker.before()
+
+
+def test_retry_after_is_honoured_within_budget(sleeps):
+    session = StubSession(_response(503, headers={"Retry-After": "2"}), _response(200, b"[1]"))
+    client = _client(session)
+    with resilience.budget(10):
+        assert client.get_json("/sources") == [1]
+    assert sleeps == [2.0]
+    assert client.breaker._failures == 0
+
+
+def test_stops_when_backoff_exceeds_remaining_budget(sleeps):
+    session = StubSession(_response(503, headers={"Retry-After": "30"}), _response(200))
+    client = _client(session)
+    with resilience.budget(2), pytest.raises(requests.HTTPError):
+        client.get_json("/sources")
+    assert len(session.timeouts) == 1
+    assert sleeps == []
+    assert client.breaker._failures == 1
+
+
+def test_backoff_grows_like_urllib3_retry(sleeps):
+    session = StubSession(_response(502), _response(502), _response(200, b"[]"))
+    client = _client(session)
+    with resilience.budget(10):
+        assert client.get_json("/sources") == []
+    # No wait before the first retry, then backoff_factor * 2 ** attempt.
+    assert sleeps == [0.0, 1.0]
+
+
+def test_budget_spent_before_sending_raises_deadline_exceeded():
+    session = StubSession()
+    client = _client(session)
+    with resilience.budget(0), pytest.raises(resilience.DeadlineExceeded):
+        client.get_json("/sources")
+    assert session.timeouts == []
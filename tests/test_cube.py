@@ -0,0 +1,60 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from services.cube import EmissionsCube
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "api_2024_co2e_100yr.json")
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    with open(FIXTURE) as f:
+        return json.load(f)["emissions"]["global"]
+
+
+@pytest.fixture
+def cube(recorded):
+    cube = EmissionsCube([2024], ["co2e_100yr"], [])
+    cube.fill(2024, "co2e_100yr", None, recorded)
+    return cube
+
+
+def _by_sector(entries):
+    return {e["sector"]: (e["emissionsQuantity"], e.get("percentage")) for e in entries}
+
+
+def test_unfiltered_query_matches_api(cube, recorded):
+    ours = cube.query(2024, "co2e_100yr")
+    assert _by_sector(ours["sectors"]["summaries"]) == _by_sector(
+        recorded["sectors"]["summaries"]
+    )
+    assert {e["sector"] for e in ours["sectors"]["timeseries"]} == {
+        e["sector"] for e in recorded["sectors"]["timeseries"]
+    }
+    assert ours["totals"]["timeseries"] == recorded["totals"]["timeseries"]
+
+
+def test_filter_leaves_out_unreported_sectors(cube):
+    ours = cube.query(2024, "co2e_100yr", sector=["power", "buildings"])
+    assert [e["sector"] for e in ours["sectors"]["summaries"]] == ["power"]
+    assert cube.query(2024, "co2e_100yr", sector=["not-a-sector"]) is None
+
+
+def test_save_and_load_round_trip(cube, tmp_path):
+    path = str(tmp_path / "cube.npz")
+    cube.save(path)
+    loaded = EmissionsCube.load(path)
+    assert loaded.query(2024, "co2e_100yr") == cube.query(2024, "co2e_100yr")
+
+
+def test_cube_saved_without_summaries_drops_empty_sectors(cube, tmp_path):
+    path = str(tmp_path / "old.npz")
+    cube.save(path)
+    with np.load(path) as f:
+        arrays = {k: f[k] for k in f.files if k not in ("present", "summaries")}
+    np.savez_compressed(path, **arrays)
+    summaries = EmissionsCube.load(path).query(2024, "co2e_100yr")["sectors"]["summaries"]
+    assert {e["sector"] for e in summaries} == {"power", "waste", "agriculture"}
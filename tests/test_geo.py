@@ -0,0 +1,42 @@
+import pytest
+
+from services import api, geo, resilience
+
+
+@pytest.fixture
+def small_index(monkeypatch):
+    # Only the two largest sources make the overall cut.
+    monkeypatch.setattr(geo, "INDEX_SIZE", 2)
+    with geo._lock:
+        geo._source_sets.clear()
+    yield
+    with geo._lock:
+        geo._source_sets.clear()
+
+
+def _ids(source_set, rows):
+    return [s["id"] for s in source_set.subset(rows)]
+
+
+def test_sector_filter_matches_per_sector_rankings(small_index):
+    source_set = geo.source_set(2024, "co2e_100yr")
+    for sectors in (["waste"], ["agriculture", "waste"], ["power"]):
+        rows = source_set.index.query(geo.WORLD, sectors, 500)
+        expected = api.get_sources(year=2024, sectors=sectors, limit=500)
+        assert _ids(source_set, rows) == [s["id"] for s in expected]
+
+
+def test_viewport_query_is_ranked_within_bounds(small_index):
+    source_set = geo.source_set(2024, "co2e_100yr")
+    europe = (34.0, 62.0, -12.0, 32.0)
+    assert _ids(source_set, source_set.index.query(europe, None, 10)) == [3, 6]
+    assert _ids(source_set, source_set.index.query(europe, ["waste"], 10)) == [6]
+
+
+def test_degraded_build_is_not_cached(small_index):
+    with resilience.budget():
+        resilience.mark_failed()
+        geo.source_set(2024, "co2e_100yr")
+    assert not geo._source_sets
+    geo.source_set(2024, "co2e_100yr")
+    assert len(geo._source_sets) == 1
@@ -0,0 +1,101 @@
+import pytest
+
+from services import output_cache, resilience
+from services.output_cache import OutputCache
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = OutputCache(max_bytes=40)
+    cache.set("a", b"x" * 10)
+    cache.set("b", b"x" * 10)
+    cache.set("c", b"x" * 10)
+    assert cache.get("a") is not None
+    cache.set("d", b"x" * 10)
+    cache.set("e", b"x" * 10)
+    # "b" was the least recently used once "a" was read.
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    stats = cache.stats()
+    assert stats["bytes"] <= 40
+    assert stats["entries"] == 4
+    assert stats["evictions"] == 1
+
+
+def test_replacing_a_key_counts_its_bytes_once():
+    cache = OutputCache(max_bytes=40)
+    cache.set("a", b"x" * 10)
+    cache.set("a", b"x" * 5)
+    assert cache.stats()["bytes"] == 5
+
+
+def test_skips_bodies_over_a_quarter_of_the_budget():
+    cache = OutputCache(max_bytes=40)
+    cache.set("small", b"x" * 10)
+    cache.set("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("small") == b"x" * 10
+    assert cache.stats()["stores"] == 1
+
+
+def test_key_covers_inputs_and_data_version(monkeypatch):
+    body = {"output": "agg-total-chart.figure", "inputs": [{"value": 1}], "state": []}
+    key = output_cache.cache_key(body)
+    assert output_cache.cache_key(dict(body, inputs=[{"value": 2}])) != key
+    monkeypatch.setattr(output_cache, "data_version", lambda: "next")
+    assert output_cache.cache_key(body) != key
+
+
+@pytest.fixture(scope="module")
+def server():
+    import app
+
+    return app.server
+
+
+@pytest.fixture
+def client(server):
+    output_cache.cache.clear()
+    yield server.test_client()
+    output_cache.cache.clear()
+
+
+TOTAL_CHART = {
+    "output": "..agg-total-chart.figure...agg-total-title.children..",
+    "outputs": [
+        {"id": "agg-total-chart", "property": "figure"},
+        {"id": "agg-total-title", "property": "children"},
+    ],
+    "inputs": [
+        {"id": "agg-data", "property": "data", "value": None},
+        {"id": "agg-sectors", "property": "value", "value": []},
+    ],
+    "changedPropIds": ["agg-data.data"],
+    "state": [],
+}
+
+
+def _post(client, body=TOTAL_CHART):
+    return client.post("/_dash-update-component", json=body)
+
+
+def test_repeated_callback_is_served_from_cache(client):
+    first = _post(client)
+    assert first.status_code == 200
+    assert "X-Output-Cache" not in first.headers
+    second = _post(client)
+    assert second.headers["X-Output-Cache"] == "hit"
+    assert second.get_data() == first.get_data()
+
+
+def test_changed_inputs_miss(client):
+    _post(client)
+    data, sectors = TOTAL_CHART["inputs"]
+    body = dict(TOTAL_CHART, inputs=[data, dict(sectors, value=["power"])])
+    assert "X-Output-Cache" not in _post(client, body).headers
+
+
+def test_degraded_response_is_not_stored(client, monkeypatch):
+    monkeypatch.setattr(resilience, "reusable", lambda: False)
+    assert _post(client).status_code == 200
+    assert "X-Output-Cache" not in _post(client).headers
+    assert output_cache.cache.stats()["entries"] == 0
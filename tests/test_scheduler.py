@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from services import scheduler as scheduler_module
+from services.scheduler import (
+    BACKGROUND,
+    INTERACTIVE,
+    QueueTimeout,
+    RequestScheduler,
+    TokenBucket,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freeze the bucket's wall clock; advance it by assigning ``clock.now``."""
+
+    class Clock:
+        now = 1000.0
+
+    monkeypatch.setattr(scheduler_module.time, "time", lambda: Clock.now)
+    return Clock
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    return str(tmp_path / "ratelimit" / "bucket")
+
+
+def test_bucket_refills_at_rate(clock, state_file):
+    bucket = TokenBucket(rate=2, burst=2, path=state_file)
+    assert bucket.take() == 0.0
+    assert bucket.take() == 0.0
+    assert bucket.take() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.take() == 0.0
+    # Refill never goes past the burst.
+    clock.now += 60
+    assert [bucket.take() for _ in range(3)][-1] == pytest.approx(0.5)
+
+
+def test_buckets_on_one_file_share_tokens(clock, state_file):
+    first = TokenBucket(rate=1, burst=2, path=state_file)
+    second = TokenBucket(rate=1, burst=2, path=state_file)
+    assert first.take() == 0.0
+    assert second.take() == 0.0
+    assert first.take() == pytest.approx(1.0)
+    assert second.take() == pytest.approx(1.0)
+
+
+def test_reserve_is_kept_for_interactive(clock, state_file):
+    bucket = TokenBucket(rate=1, burst=3, path=state_file, reserve=2)
+    assert bucket.take(BACKGROUND) == 0.0
+    assert bucket.take(BACKGROUND) == pytest.approx(1.0)
+    assert bucket.take(INTERACTIVE) == 0.0
+    assert bucket.take(INTERACTIVE) == 0.0
+    assert bucket.take(INTERACTIVE) == pytest.approx(1.0)
+
+
+def test_interactive_waiters_go_before_background(state_file):
+    scheduler = RequestScheduler(TokenBucket(rate=5, burst=1, path=state_file))
+    scheduler.acquire()
+    order = []
+
+    def waiter(priority, name):
+        scheduler.acquire(priority=priority)
+        order.append(name)
+
+    def start(priority, names):
+        threads = [threading.Thread(target=waiter, args=(priority, n)) for n in names]
+        for t in threads:
+            t.start()
+        return threads
+
+    threads = start(BACKGROUND, ["bg0", "bg1"])
+    while scheduler.depth()["background"] < 2:
+        time.sleep(0.005)
+    threads += start(INTERACTIVE, ["ui0", "ui1"])
+    for t in threads:
+        t.join()
+    assert order == ["ui0", "ui1", "bg0", "bg1"]
+    assert scheduler.depth() == {"interactive": 0, "background": 0}
+
+
+def test_queue_timeout_at_deadline(state_file):
+    scheduler = RequestScheduler(
+        TokenBucket(rate=0.5, burst=1, path=state_file),
+        {INTERACTIVE: 0.1, BACKGROUND: 5.0},
+    )
+    scheduler.acquire()
+    start = time.monotonic()
+    with pytest.raises(QueueTimeout):
+        scheduler.acquire(priority=INTERACTIVE)
+    # A caller's own deadline shortens the priority's.
+    with pytest.raises(QueueTimeout):
+        scheduler.acquire(priority=BACKGROUND, deadline=0.1)
+    assert time.monotonic() - start < 1.0
+    assert scheduler.depth() == {"interactive": 0, "background": 0}
+
+
+def test_no_bucket_never_waits():
+    assert RequestScheduler(None).acquire() == 0.0
@@ -0,0 +1,79 @@
+import inspect
+import json
+import os
+
+import pytest
+
+from services import api, snapshot
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "api_2024_co2e_100yr.json")
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    with open(FIXTURE) as f:
+        return json.load(f)
+
+
+def test_signatures_match_api():
+    for name in ("get_sources", "get_emissions"):
+        ours = inspect.signature(getattr(snapshot, name))
+        theirs = inspect.signature(getattr(api, name))
+        assert list(ours.parameters) == list(theirs.parameters)
+        for param in ours.parameters.values():
+            assert param.default == theirs.parameters[param.name].default
+
+
+def test_api_dispatches_to_snapshot(recorded):
+    assert api.BACKEND == "snapshot"
+    assert api.get_sources(year=2024, limit=3) == recorded["sources"][:3]
+
+
+def test_sources_match_api_shape(recorded):
+    assert snapshot.get_sources(year=2024, limit=100) == recorded["sources"]
+
+
+def test_sources_limit_and_sector_filter(recorded):
+    assert [s["id"] for s in snapshot.get_sources(year=2024, limit=2)] == [1, 2]
+    waste = snapshot.get_sources(year=2024, sectors=["waste"], limit=100)
+    assert waste == [s for s in recorded["sources"] if s["sector"] == "waste"]
+    both = snapshot.get_sources(year=2024, sectors=["power", "waste"], limit=3)
+    assert [s["id"] for s in both] == [1, 3, 4]
+
+
+def test_missing_partition_is_empty():
+    assert snapshot.get_sources(year=2021) == []
+    assert snapshot.get_emissions(year=2021) is None
+    assert snapshot.get_emissions(year=2024, continent="Oceania") is None
+
+
+def _by_key(entries):
+    return sorted(entries, key=lambda e: (e.get("sector") or "", e.get("subsector") or "", e.get("month", 0)))
+
+
+@pytest.mark.parametrize("continent, name", [(None, "global"), ("Europe", "Europe")])
+def test_unfiltered_emissions_match_api(recorded, continent, name):
+    data = snapshot.get_emissions(year=2024, continent=continent)
+    expected = recorded["emissions"][name]
+    for section in ("totals", "sectors", "subsectors"):
+        for kind in ("timeseries", "summaries"):
+            assert _by_key(data[section][kind]) == pytest.approx(_by_key(expected[section][kind]))
+
+
+def test_sector_filter_resums_totals(recorded):
+    data = snapshot.get_emissions(year=2024, sector=["power", "waste"])
+    sectors = recorded["emissions"]["global"]["sectors"]
+    selected = [e for e in sectors["timeseries"] if e["sector"] in ("power", "waste")]
+
+    months = {t["month"]: t["emissionsQuantity"] for t in data["totals"]["timeseries"]}
+    for month in (1, 2, 3):
+        assert months[month] == pytest.approx(
+            sum(e["emissionsQuantity"] for e in selected if e["month"] == month)
+        )
+    total = sum(e["emissionsQuantity"] for e in selected)
+    assert data["totals"]["summaries"][0]["emissionsQuantity"] == pytest.approx(total)
+
+    shares = {e["sector"]: e["percentage"] for e in data["sectors"]["summaries"]}
+    assert set(shares) == {"power", "waste"}
+    assert sum(shares.values()) == pytest.approx(100.0)
+    assert {e["sector"] for e in data["sectors"]["timeseries"]} == {"power", "waste"}